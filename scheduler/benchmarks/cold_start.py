@@ -0,0 +1,52 @@
+"""
+Compares cold start of the command line interface with imports of the GUI.
+Every command runs in a new interpreter, the best time of several runs is shown.
+
+Usage: python -m scheduler.benchmarks.cold_start
+"""
+import os
+import subprocess
+import sys
+import time
+
+REPEATS = 5
+COMMANDS = {
+    "python": ["-c", "pass"],
+    "cli": ["-m", "scheduler", "list"],
+    "cli imports qt": [
+        "-c",
+        "import sys, scheduler.cli; print(any(m.startswith('PyQt5') for m in sys.modules))",
+    ],
+    "gui imports": ["-c", "import scheduler.view.main_window"],
+    "gui window": [
+        "-c",
+        "from PyQt5.QtWidgets import QApplication; app = QApplication([]); "
+        "from scheduler.view.main_window import MainWindow; MainWindow()",
+    ],
+}
+
+
+def run(args):
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, *args], env=env, capture_output=True, text=True
+        )
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result.stdout.strip()
+
+
+def main():
+    print(f"{'command':>16} {'seconds':>10}  output")
+    for name, args in COMMANDS.items():
+        elapsed, output = run(args)
+        print(
+            f"{name:>16} {elapsed:>10.3f}  {output.splitlines()[0] if output else ''}"
+        )
+
+
+if __name__ == "__main__":
+    main()
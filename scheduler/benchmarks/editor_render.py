@@ -0,0 +1,93 @@
+"""
+Compares the widget schedule editor with the table view editor on weeks
+with more and more lessons in a day. The table paints only the visible cells,
+so the cost of one viewport does not grow with the week.
+Models are built in memory and Qt runs offscreen.
+
+Usage: python -m scheduler.benchmarks.editor_render
+"""
+import os
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication, QTableView
+
+from scheduler.data.models.schedule import Day, Week
+from scheduler.data.models.structure import Group, Lesson, Classroom, Teacher
+from scheduler.view.schedule_interaction import DayHolder
+from scheduler.view.schedule_table import WeekTableModel
+
+LESSON_COUNTS = (10, 100, 1000, 10000)
+# The widget editor is too slow for bigger weeks
+MAX_WIDGET_LESSONS = 100
+VIEWPORT_SIZE = 720, 470
+REPEATS = 5
+
+
+def build_week(lesson_count):
+    for cls in (Group, Lesson, Classroom, Teacher, Day, Week):
+        cls.objects.clear()
+    Week.by_group.clear()
+    Day.occupancy.clear()
+    group = Group(id=1, name="Group 1")
+    teachers = [
+        Teacher(id=i, name=f"Teacher {i}", image="default.png") for i in range(1, 11)
+    ]
+    for i in range(1, 11):
+        Lesson(id=i, name=f"Lesson {i}", teacher=teachers[i - 1])
+        Classroom(id=i, name=f"Room {i}")
+    ids = [i % 10 + 1 for i in range(lesson_count)]
+    days = [
+        Day(
+            id=day_order,
+            lessons=ids,
+            classrooms=ids,
+            group_obj=group,
+            day_order=day_order,
+        )
+        for day_order in range(1, 7)
+    ]
+    return Week(id=1, days=days, group_obj=group)
+
+
+def time_table(week):
+    model = WeekTableModel(week)
+    view = QTableView()
+    view.setModel(model)
+    view.resize(*VIEWPORT_SIZE)
+    view.grab()
+    start = time.perf_counter()
+    for i in range(REPEATS):
+        # Scrolling to the middle makes Qt paint another part of the table
+        view.scrollTo(model.index(model.rows // 2 * (i % 2), 0))
+        view.grab()
+    elapsed = (time.perf_counter() - start) / REPEATS
+    model.close()
+    return elapsed
+
+
+def time_widgets(week):
+    start = time.perf_counter()
+    holders = [DayHolder(None, day) for day in week.days]
+    elapsed = time.perf_counter() - start
+    for holder in holders:
+        holder.deleteLater()
+    return elapsed
+
+
+def main():
+    app = QApplication.instance() or QApplication([])
+    print(f"{'lessons/day':>12} {'table s':>10} {'widgets s':>10}")
+    for lesson_count in LESSON_COUNTS:
+        week = build_week(lesson_count)
+        table = time_table(week)
+        widgets = "-"
+        if lesson_count <= MAX_WIDGET_LESSONS:
+            widgets = f"{time_widgets(week):.4f}"
+        app.processEvents()
+        print(f"{lesson_count:>12} {table:>10.4f} {widgets:>10}")
+
+
+if __name__ == "__main__":
+    main()
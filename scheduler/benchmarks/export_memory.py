@@ -0,0 +1,80 @@
+"""
+Shows that peak memory of the streaming xlsx export does not grow
+with the number of groups.
+Schedules are written into a temporary store unless SCHEDULER_STORE_DIR is set.
+
+Usage: python -m scheduler.benchmarks.export_memory
+"""
+import os
+import time
+import tracemalloc
+
+from scheduler.config import MAIN_DB_NAME
+from scheduler.data.database_interaction.db_utils import create_db_with_models
+from scheduler.data.export import export_schedule
+from scheduler.data.models.core import session
+from scheduler.data.models.schedule import Schedule, Day, Week
+from scheduler.data.models.structure import (
+    Group,
+    Lesson,
+    Classroom,
+    Teacher,
+    structure_load,
+)
+from .synthetic import temporary_store
+
+GROUP_COUNTS = (250, 500, 1000, 2000)
+LESSONS_PER_DAY = 6
+
+
+def build_schedule(name, group_count):
+    with session():
+        while len([i for i in Group.objects if i > 0]) < group_count:
+            Group.new(name=f"Group {len(Group.objects)}")
+    Schedule.create(name)
+    Schedule(name)
+    lessons = [i % 10 + 1 for i in range(LESSONS_PER_DAY)]
+    with session():
+        for group_id in range(1, group_count + 1):
+            group = Group.objects[group_id]
+            days = [
+                Day.new(
+                    day_order=day_order,
+                    lessons=lessons,
+                    classrooms=lessons,
+                    group_obj=group,
+                )
+                for day_order in range(1, 7)
+            ]
+            Week.new(days=days, group_obj=group)
+
+
+def run(store):
+    create_db_with_models(MAIN_DB_NAME, Teacher, Group, Lesson, Classroom)
+    structure_load()
+    with session():
+        for i in range(1, 11):
+            teacher = Teacher.new(name=f"Teacher {i}", image="default.png")
+            Lesson.new(name=f"Lesson {i}", teacher=teacher)
+            Classroom.new(name=f"Room {i}")
+    print(f"{'groups':>8} {'seconds':>10} {'peak KiB':>10}")
+    for group_count in GROUP_COUNTS:
+        name = f"export_{group_count}"
+        build_schedule(name, group_count)
+        filename = os.path.join(store, name + ".xlsx")
+        tracemalloc.start()
+        start = time.perf_counter()
+        export_schedule(name, filename)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{group_count:>8} {elapsed:>10.3f} {peak / 1024:>10.0f}")
+
+
+def main():
+    with temporary_store() as store:
+        run(store)
+
+
+if __name__ == "__main__":
+    main()
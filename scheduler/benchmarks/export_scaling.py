@@ -0,0 +1,62 @@
+"""
+Shows how the data pass of the xlsx export scales with the number of groups.
+Models are built in memory, so no database is touched.
+
+Usage: python -m scheduler.benchmarks.export_scaling
+"""
+import time
+
+from scheduler.data.models.schedule import Schedule, Day, Week
+from scheduler.data.models.structure import Group
+
+GROUP_COUNTS = (250, 500, 1000, 2000, 4000)
+LESSONS_PER_DAY = 6
+
+
+def build_weeks(group_count):
+    Group.objects.clear()
+    Day.objects.clear()
+    Week.objects.clear()
+    Week.by_group.clear()
+    empty = [-1] * LESSONS_PER_DAY
+    day_id = 0
+    for group_id in range(1, group_count + 1):
+        group = Group(id=group_id, name=f"Group {group_id}")
+        days = []
+        for day_order in range(1, 7):
+            day_id += 1
+            days.append(
+                Day(
+                    id=day_id,
+                    lessons=empty,
+                    classrooms=empty,
+                    group_obj=group,
+                    day_order=day_order,
+                )
+            )
+        Week(id=group_id, days=days, group_obj=group)
+
+
+# Reads every day item of every week through the models without writing a workbook
+def export_pass():
+    cells = 0
+    for group in list(Group.objects.values()):
+        week = Schedule.get_week(group)
+        for day in week.days:
+            for lesson, classroom in zip(day.lessons, day.classrooms):
+                cells += len(str(lesson)) + len(str(classroom))
+    return cells
+
+
+def main():
+    print(f"{'groups':>8} {'seconds':>10} {'us/group':>10}")
+    for group_count in GROUP_COUNTS:
+        build_weeks(group_count)
+        start = time.perf_counter()
+        export_pass()
+        elapsed = time.perf_counter() - start
+        print(f"{group_count:>8} {elapsed:>10.4f} {elapsed / group_count * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Measures the throughput of the bulk structure import on 100k rows
+and compares it with creating models one by one.
+Databases are created in a temporary store unless SCHEDULER_STORE_DIR is set.
+
+Usage: python -m scheduler.benchmarks.import_throughput
+"""
+import csv
+import os
+import time
+
+from scheduler.config import MAIN_DB_NAME
+from scheduler.data.database_interaction.db_utils import create_db_with_models
+from scheduler.data.importer import import_structure
+from scheduler.data.models.structure import (
+    Group,
+    Teacher,
+    Lesson,
+    Classroom,
+    structure_load,
+)
+from .synthetic import temporary_store
+
+# Rows of every kind in the imported file
+ROWS = {"teacher": 10_000, "group": 30_000, "classroom": 20_000, "lesson": 40_000}
+# Rows created one by one, it is slow, so the count is smaller
+SINGLE_ROWS = 2_000
+
+
+def write_file(filename):
+    with open(filename, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(("kind", "name", "teacher"))
+        for kind, count in ROWS.items():
+            for i in range(count):
+                if kind == "lesson":
+                    writer.writerow(
+                        (kind, f"Lesson {i}", f"Teacher {i % ROWS['teacher']}")
+                    )
+                else:
+                    writer.writerow((kind, f"{kind.capitalize()} {i}", ""))
+
+
+def run(store):
+    create_db_with_models(MAIN_DB_NAME, Teacher, Group, Lesson, Classroom)
+    structure_load()
+    filename = os.path.join(store, "structure.csv")
+    write_file(filename)
+    total = sum(ROWS.values())
+
+    start = time.perf_counter()
+    result = import_structure(filename)
+    elapsed = time.perf_counter() - start
+    assert not result.errors, result.errors[:5]
+    print(f"import: {total} rows in {elapsed:.2f} s, {total / elapsed:.0f} rows/s")
+
+    start = time.perf_counter()
+    for i in range(SINGLE_ROWS):
+        Group.new(name=f"Single group {i}")
+    elapsed = time.perf_counter() - start
+    print(
+        f"new() one by one: {SINGLE_ROWS} rows in {elapsed:.2f} s, "
+        f"{SINGLE_ROWS / elapsed:.0f} rows/s"
+    )
+
+
+def main():
+    with temporary_store() as store:
+        run(store)
+
+
+if __name__ == "__main__":
+    main()
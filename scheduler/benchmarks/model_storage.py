@@ -0,0 +1,79 @@
+"""
+Shows the memory taken by 100k days and the time of attribute access of models.
+Models are built in memory, so no database is touched.
+
+Usage: python -m scheduler.benchmarks.model_storage
+"""
+import gc
+import timeit
+import tracemalloc
+
+from scheduler.data.models.schedule import Day
+from scheduler.data.models.structure import Group, Lesson, Classroom, Teacher
+
+DAY_COUNT = 100_000
+LESSONS_PER_DAY = 6
+ACCESS_NUMBER = 200_000
+
+
+def build_structure():
+    teacher = Teacher(id=1, name="Teacher", image="default.png")
+    for i in range(1, 11):
+        Lesson(id=i, name=f"Lesson {i}", teacher=teacher)
+        Classroom(id=i, name=f"Room {i}")
+    return Group(id=1, name="Group")
+
+
+def build_days(group):
+    items = [i % 10 + 1 for i in range(LESSONS_PER_DAY)]
+    for day_id in range(1, DAY_COUNT + 1):
+        Day(
+            id=day_id,
+            lessons=items,
+            classrooms=items,
+            group_obj=group,
+            day_order=day_id % 6 + 1,
+        )
+
+
+def main():
+    group = build_structure()
+    gc.collect()
+    tracemalloc.start()
+    build_days(group)
+    # Only days and their manager are measured, not the occupancy index
+    Day.occupancy.clear()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(
+        f"{DAY_COUNT} days: {size / 2 ** 20:.1f} MiB, {size / DAY_COUNT:.0f} bytes per day"
+    )
+
+    day = Day.objects[1]
+    lesson = Lesson.objects[1]
+    statements = {
+        "day.day_order": "day.day_order",
+        "day.group_obj": "day.group_obj",
+        "day.lessons": "day.lessons",
+        "day.lessons[0].id": "day.lessons[0].id",
+        "lesson.teacher": "lesson.teacher",
+        "lesson.teacher.id": "lesson.teacher.id",
+        "day.get_occupancy_item": "day.get_occupancy_item",
+        "day.day_order = 1": "day.day_order = 1",
+    }
+    print(f"{'statement':>24} {'ns':>8}")
+    for name, statement in statements.items():
+        best = min(
+            timeit.repeat(
+                statement,
+                globals={"day": day, "lesson": lesson},
+                number=ACCESS_NUMBER,
+                repeat=5,
+            )
+        )
+        print(f"{name:>24} {best / ACCESS_NUMBER * 1e9:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
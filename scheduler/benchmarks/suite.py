@@ -0,0 +1,235 @@
+"""
+Times the data layer on a synthetic school and writes the results as json,
+so runs of different releases could be compared.
+Databases are created in a temporary store unless SCHEDULER_STORE_DIR is set.
+
+Usage: python -m scheduler.benchmarks.suite [--size medium] [--output result.json]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import time
+
+from scheduler.data.analytics import ScheduleMatrix
+from scheduler.data.database_interaction.db_utils import db_exists
+from scheduler.data.export import export_schedule
+from scheduler.data.models.core import session
+from scheduler.data.models.schedule import Schedule, Day
+from scheduler.data.models.structure import (
+    Group,
+    Teacher,
+    Lesson,
+    Classroom,
+    structure_load,
+)
+from .synthetic import SIZES, SchoolSize, generate_school, temporary_store
+
+SCHEDULE_NAME = "synthetic"
+# Schedule without weeks, it is recreated by the week creation benchmarks
+EMPTY_SCHEDULE_NAME = "synthetic_empty"
+# Count of instances written by the save and new benchmarks
+WRITE_COUNT = 200
+
+
+def measure(func, repeats, ops=1, setup=None):
+    """
+    :param func: function to time, it is called once per repeat
+    :param ops: count of operations done by one call of func
+    :param setup: function called before every repeat, it is not timed
+    :return: dict with the best and mean seconds of a call and seconds per operation
+    """
+    times = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    best = min(times)
+    return {
+        "best": best,
+        "mean": sum(times) / len(times),
+        "repeats": repeats,
+        "ops": ops,
+        "per_op": best / ops,
+    }
+
+
+def get_models(cls):
+    return [obj for obj in cls.objects.values() if isinstance(obj, cls)]
+
+
+def clear_structure():
+    for cls in (Group, Teacher, Lesson, Classroom):
+        cls.objects.clear()
+
+
+def check_clashes(days):
+    # The same calls as DayEventHolder.check_if_overlap makes for every day item
+    count = 0
+    for day in days:
+        for index in range(len(day.lessons)):
+            if day.has_classroom_clash(index) or day.has_teacher_clash(index):
+                count += 1
+    return count
+
+
+def save_days(days):
+    for day in days:
+        day.mark_dirty("lessons", "classrooms")
+        day.save()
+
+
+def save_days_in_session(days):
+    with session():
+        save_days(days)
+
+
+def create_groups():
+    for i in range(WRITE_COUNT):
+        Group.new(name=f"New group {i}")
+
+
+def create_groups_in_session():
+    with session():
+        create_groups()
+
+
+def open_empty_schedule():
+    if db_exists(EMPTY_SCHEDULE_NAME):
+        Schedule.delete(EMPTY_SCHEDULE_NAME)
+    Schedule.create(EMPTY_SCHEDULE_NAME)
+    Schedule(EMPTY_SCHEDULE_NAME, lazy=False)
+
+
+def run(size: SchoolSize, repeats, seed, store):
+    results = dict()
+    generate_school(size, SCHEDULE_NAME, seed)
+    groups = get_models(Group)
+
+    results["structure_load"] = measure(
+        structure_load,
+        repeats,
+        ops=size.groups + size.teachers + size.classrooms + size.lessons,
+        setup=clear_structure,
+    )
+    results["schedule_open"] = measure(
+        lambda: Schedule(SCHEDULE_NAME, lazy=False), repeats, ops=size.groups
+    )
+    results["schedule_open_lazy"] = measure(
+        lambda: Schedule(SCHEDULE_NAME, lazy=True), repeats, ops=size.groups
+    )
+    # Weeks are loaded on the first access, so the schedule is reopened every time
+    results["get_week_lazy"] = measure(
+        lambda: [Schedule.get_week(group) for group in groups],
+        repeats,
+        ops=len(groups),
+        setup=lambda: Schedule(SCHEDULE_NAME, lazy=True),
+    )
+
+    # Weeks are created in a new schedule every time, one by one and together
+    results["create_week"] = measure(
+        lambda: [Schedule.get_week(group) for group in groups],
+        repeats,
+        ops=len(groups),
+        setup=open_empty_schedule,
+    )
+    results["create_weeks"] = measure(
+        lambda: Schedule.get_weeks(groups),
+        repeats,
+        ops=len(groups),
+        setup=open_empty_schedule,
+    )
+
+    Schedule(SCHEDULE_NAME, lazy=False)
+    results["get_week"] = measure(
+        lambda: [Schedule.get_week(group) for group in groups],
+        repeats,
+        ops=len(groups),
+    )
+    days = get_models(Day)
+    results["clash_check"] = measure(
+        lambda: check_clashes(days),
+        repeats,
+        ops=sum(len(day.lessons) for day in days),
+    )
+
+    results["matrix_build"] = measure(ScheduleMatrix, repeats, ops=len(days))
+    matrix = ScheduleMatrix()
+    results["matrix_conflicts"] = measure(
+        matrix.find_conflicts, repeats, ops=int(matrix.lengths.sum())
+    )
+
+    filename = os.path.join(store, SCHEDULE_NAME + ".xlsx")
+    results["export"] = measure(
+        lambda: export_schedule(SCHEDULE_NAME, filename), repeats, ops=size.groups
+    )
+
+    written = days[:WRITE_COUNT]
+    results["save"] = measure(lambda: save_days(written), repeats, ops=len(written))
+    results["save_session"] = measure(
+        lambda: save_days_in_session(written), repeats, ops=len(written)
+    )
+    results["new"] = measure(create_groups, repeats, ops=WRITE_COUNT)
+    results["new_session"] = measure(create_groups_in_session, repeats, ops=WRITE_COUNT)
+    return results
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m scheduler.benchmarks.suite",
+        description="Benchmarks of the data layer on a synthetic school",
+    )
+    parser.add_argument("--size", choices=SIZES, default="medium")
+    for field in SchoolSize._fields:
+        parser.add_argument(
+            "--" + field.replace("_", "-"),
+            type=int,
+            dest=field,
+            help="overrides the value of the size",
+        )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("-o", "--output", help="path of the json file with results")
+    return parser
+
+
+def main(argv=None):
+    args = get_parser().parse_args(argv)
+    size = SIZES[args.size]._replace(
+        **{
+            field: getattr(args, field)
+            for field in SchoolSize._fields
+            if getattr(args, field) is not None
+        }
+    )
+    with temporary_store() as store:
+        results = run(size, args.repeats, args.seed, store)
+
+    print(f"{'benchmark':>20} {'best s':>10} {'mean s':>10} {'per op us':>10}")
+    for name, result in results.items():
+        print(
+            f"{name:>20} {result['best']:>10.4f} {result['mean']:>10.4f}"
+            f" {result['per_op'] * 1e6:>10.1f}"
+        )
+
+    report = {
+        "meta": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "size": size._asdict(),
+            "seed": args.seed,
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=4)
+
+
+if __name__ == "__main__":
+    main()
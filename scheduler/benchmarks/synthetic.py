@@ -0,0 +1,125 @@
+"""
+Deterministic generator of a synthetic school: structure in the main db
+and one schedule with a full week for every group.
+The same size and seed always give the same databases.
+"""
+import os
+import random
+import tempfile
+from collections import namedtuple
+from contextlib import contextmanager
+
+import scheduler.data.database_interaction.db_utils as db_utils
+from scheduler.config import MAIN_DB_NAME
+from scheduler.data.database_interaction.db_utils import (
+    create_db_with_models,
+    db_exists,
+)
+from scheduler.data.models.core import session
+from scheduler.data.models.schedule import Schedule, Day, Week
+from scheduler.data.models.structure import (
+    Group,
+    Teacher,
+    Lesson,
+    Classroom,
+    structure_load,
+)
+
+SchoolSize = namedtuple(
+    "SchoolSize",
+    ("groups", "teachers", "classrooms", "lessons", "slots_per_day"),
+    defaults=(100, 40, 30, 60, 6),
+)
+
+SMALL = SchoolSize(20, 10, 10, 15, 5)
+MEDIUM = SchoolSize()
+LARGE = SchoolSize(1000, 300, 250, 500, 8)
+SIZES = {"small": SMALL, "medium": MEDIUM, "large": LARGE}
+
+
+@contextmanager
+def temporary_store():
+    """
+    Dbs are created in a temporary directory inside the block,
+    it is removed with them when the block ends.
+    If SCHEDULER_STORE_DIR is set, its store is used and kept
+    :return: path of the store
+    """
+    if "SCHEDULER_STORE_DIR" in os.environ:
+        yield db_utils.STORE_DIR
+        return
+    default = db_utils.STORE_DIR
+    with tempfile.TemporaryDirectory() as store:
+        db_utils.STORE_DIR = store
+        try:
+            yield store
+        finally:
+            db_utils.close_all_connections()
+            db_utils.STORE_DIR = default
+
+
+def generate_structure(size: SchoolSize, seed=0):
+    """
+    Creates the main db with groups, teachers, classrooms and lessons.
+    The main db must not exist
+    """
+    rng = random.Random(seed)
+    create_db_with_models(MAIN_DB_NAME, Teacher, Group, Lesson, Classroom)
+    structure_load()
+    Schedule.is_main_data_loaded = True
+    with session():
+        teachers = [
+            Teacher.new(name=f"Teacher {i}", image="default.png")
+            for i in range(1, size.teachers + 1)
+        ]
+        for i in range(1, size.groups + 1):
+            Group.new(name=f"Group {i}")
+        for i in range(1, size.classrooms + 1):
+            Classroom.new(name=f"Room {i}")
+        for i in range(1, size.lessons + 1):
+            Lesson.new(name=f"Lesson {i}", teacher=rng.choice(teachers))
+
+
+def generate_schedule(name, size: SchoolSize, seed=0):
+    """
+    Creates the schedule where every day of every group has
+    size.slots_per_day random lessons in random classrooms
+    """
+    rng = random.Random(seed)
+    if not Schedule.create(name):
+        raise ValueError(f'Schedule "{name}" can not be created')
+    Schedule(name)
+    groups = sorted(
+        (group for group in Group.objects.values() if isinstance(group, Group)),
+        key=lambda group: group.id,
+    )
+    lesson_ids = sorted(i for i in Lesson.objects if i > 0)
+    classroom_ids = sorted(i for i in Classroom.objects if i > 0)
+    with session():
+        days = Day.new_many(
+            dict(
+                day_order=day_order,
+                lessons=[rng.choice(lesson_ids) for _ in range(size.slots_per_day)],
+                classrooms=[
+                    rng.choice(classroom_ids) for _ in range(size.slots_per_day)
+                ],
+                group_obj=group,
+            )
+            for group in groups
+            for day_order in range(1, 7)
+        )
+        Week.new_many(
+            dict(days=days[i * 6 : i * 6 + 6], group_obj=group)
+            for i, group in enumerate(groups)
+        )
+
+
+def generate_school(size: SchoolSize, schedule_name="synthetic", seed=0):
+    """
+    Creates the main db and the schedule in the current store,
+    it should be empty (see SCHEDULER_STORE_DIR in config)
+    """
+    if db_exists(MAIN_DB_NAME):
+        raise ValueError("The store already has the main db")
+    generate_structure(size, seed)
+    generate_schedule(schedule_name, size, seed)
@@ -0,0 +1,178 @@
+"""
+Command line interface that works without Qt.
+
+Usage: python -m scheduler {list,export,validate,stats,import} ...
+"""
+import argparse
+import sys
+
+from scheduler.config import MAIN_DB_NAME
+from scheduler.data.database_interaction.instrumentation import action
+from scheduler.data.database_interaction.db_utils import db_exists
+from scheduler.data.models.schedule import Schedule, Day
+from scheduler.data.models.structure import (
+    Group,
+    Teacher,
+    Lesson,
+    Classroom,
+    structure_load,
+)
+
+
+class CommandError(Exception):
+    pass
+
+
+def load_structure():
+    if not db_exists(MAIN_DB_NAME):
+        raise CommandError("the main database does not exist")
+    if not Schedule.is_main_data_loaded:
+        structure_load()
+        Schedule.is_main_data_loaded = True
+
+
+# Schedule(name) creates missing schedules, so existence is checked first
+def check_schedule(name):
+    if name == MAIN_DB_NAME or not db_exists(name):
+        raise CommandError(f'schedule "{name}" does not exist')
+
+
+def count_models(cls):
+    return sum(1 for obj in cls.objects.values() if isinstance(obj, cls))
+
+
+def list_schedules(args):
+    for name in sorted(Schedule.get_all_schedules()):
+        print(name)
+    return 0
+
+
+def export(args):
+    from scheduler.data.export import export_schedule
+
+    if not args.file.endswith(".xlsx"):
+        raise CommandError("the file must have .xlsx extension")
+    load_structure()
+    check_schedule(args.name)
+
+    def progress(done, total):
+        print(f"\r{done}/{total}", end="", file=sys.stderr)
+
+    count = export_schedule(args.name, args.file, None if args.quiet else progress)
+    if not args.quiet:
+        print(file=sys.stderr)
+    print(f"Exported {count} groups to {args.file}")
+    return 0
+
+
+def validate(args):
+    from scheduler.data.analytics import find_conflicts
+
+    load_structure()
+    check_schedule(args.name)
+    conflicts = find_conflicts(Schedule(args.name))
+    for conflict in conflicts:
+        groups = ", ".join(str(group) for group in conflict.groups)
+        print(
+            f"{conflict.kind} {conflict.resource}: "
+            f"{Day.day_names[conflict.day_order]}, lesson {conflict.slot + 1}: "
+            f"{groups}"
+        )
+    print(f"{len(conflicts)} conflicts")
+    return 1 if conflicts else 0
+
+
+def stats(args):
+    load_structure()
+    for cls in (Group, Teacher, Lesson, Classroom):
+        print(f"{cls.__name__.lower()}s: {count_models(cls)}")
+    if args.name is None:
+        return 0
+
+    from scheduler.data.export import iterate_group_days
+
+    check_schedule(args.name)
+    groups, days, items, lessons = set(), 0, 0, 0
+    for group_id, day_order, day_items in iterate_group_days(args.name):
+        groups.add(group_id)
+        days += 1
+        items += len(day_items)
+        lessons += sum(1 for lesson_id, _ in day_items if lesson_id > 0)
+    print(f"groups with weeks: {len(groups)}")
+    print(f"days: {days}")
+    print(f"day items: {items}")
+    print(f"lessons: {lessons}")
+    return 0
+
+
+def import_file(args):
+    from scheduler.data.importer import import_structure, ImportFileError
+
+    load_structure()
+    try:
+        result = import_structure(args.file, args.dry_run)
+    except ImportFileError as err:
+        raise CommandError(err)
+    for error in result.errors:
+        print(error, file=sys.stderr)
+    if result.errors:
+        print(f"{len(result.errors)} errors, nothing is imported")
+        return 1
+    verb = "would be created" if args.dry_run else "created"
+    for kind in ("teacher", "group", "classroom", "lesson"):
+        print(
+            f"{kind}s: {result.created.get(kind, 0)} {verb}, "
+            f"{result.skipped.get(kind, 0)} skipped"
+        )
+    return 0
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m scheduler", description="Schedule maker without GUI"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("list", help="list schedules").set_defaults(func=list_schedules)
+
+    parser_export = commands.add_parser("export", help="export schedule to xlsx")
+    parser_export.add_argument("name", help="name of the schedule")
+    parser_export.add_argument("file", help="path of the xlsx file")
+    parser_export.add_argument(
+        "-q", "--quiet", action="store_true", help="do not show progress"
+    )
+    parser_export.set_defaults(func=export)
+
+    parser_validate = commands.add_parser(
+        "validate", help="find teacher and classroom conflicts"
+    )
+    parser_validate.add_argument("name", help="name of the schedule")
+    parser_validate.set_defaults(func=validate)
+
+    parser_stats = commands.add_parser("stats", help="count models and lessons")
+    parser_stats.add_argument("name", nargs="?", help="name of the schedule")
+    parser_stats.set_defaults(func=stats)
+
+    parser_import = commands.add_parser(
+        "import", help="import teachers, groups, classrooms and lessons"
+    )
+    parser_import.add_argument("file", help="path of the csv or xlsx file")
+    parser_import.add_argument(
+        "-n", "--dry-run", action="store_true", help="only check the file"
+    )
+    parser_import.set_defaults(func=import_file)
+    return parser
+
+
+def main(argv=None):
+    """
+    :return: exit code, 1 if validate found conflicts or import found wrong rows,
+             2 on errors
+    """
+    args = get_parser().parse_args(argv)
+    try:
+        with action(args.command):
+            return args.func(args)
+    except CommandError as err:
+        print(f"error: {err}", file=sys.stderr)
+        return 2
@@ -1,8 +1,12 @@
 import os
 
 CURRENT_DIR = os.path.dirname(__file__)
-STORE_DIR = os.path.join(CURRENT_DIR, "data/store")
-IMAGES_DIR = os.path.join(STORE_DIR, "images/")
+DEFAULT_STORE_DIR = os.path.join(CURRENT_DIR, "data/store")
+# Databases could be kept in another directory, benchmarks use it
+STORE_DIR = os.environ.get("SCHEDULER_STORE_DIR", DEFAULT_STORE_DIR)
+# Icons are here, so images stay in the default store
+IMAGES_DIR = os.path.join(DEFAULT_STORE_DIR, "images/")
+ORIGINAL_IMAGES_DIR = os.path.join(IMAGES_DIR, "originals/")
 MAIN_DB_NAME = "main_db"
 DEFAULT_TEACHER_IMG = "default.png"
 EDIT_IMG = "edit.png"
@@ -11,3 +15,29 @@ UPLIFT_IMG = "uplift.png"
 DOWNLIFT_IMG = "downlift.png"
 
 STANDARD_IMAGE_SIZE = 200, 200
+# Loaded images are stored as thumbnails, originals are kept only if it is set
+KEEP_ORIGINAL_IMAGES = False
+
+# Statistics of database calls are collected and printed at exit if it is set
+DB_STATS = os.environ.get("SCHEDULER_DB_STATS", "") not in ("", "0")
+
+# Pragmas executed on every new sqlite connection.
+# In WAL mode a db has -wal and -shm files next to it while it is open,
+# they are merged into the db before it is renamed or deleted
+DB_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "temp_store": "MEMORY",
+}
+
+# New schedules keep day items in the indexed day_slots table instead of json columns
+DAY_SLOT_STORAGE = False
+
+# Opened schedules load weeks of groups on the first access instead of all at once
+LAZY_SCHEDULE_LOADING = False
+
+# The schedule editor shows weeks in a table view instead of a widget per day item
+TABLE_SCHEDULE_EDITOR = False
+
+# Max bytes of decoded and scaled images kept in memory by the view
+PIXMAP_CACHE_BUDGET = 32 * 1024 * 1024
@@ -0,0 +1,228 @@
+from collections import namedtuple
+
+import numpy as np
+
+from scheduler.data.models.schedule import Day
+from scheduler.data.models.structure import Lesson, Teacher, Classroom, Group
+
+# kind is "teacher" or "classroom", resource is Teacher or Classroom,
+# groups are groups that use the resource in the slot of the day
+Conflict = namedtuple("Conflict", ("kind", "day_order", "slot", "resource", "groups"))
+
+
+class ScheduleMatrix:
+    """
+    Day items of the loaded schedule as int32 arrays shaped
+    (groups, 6 days, max_slots) of lesson, teacher and classroom ids.
+    Ids < 1 mean "empty", slots after the end of a day are -1.
+    Rows are groups sorted by id, columns are days by day_order.
+
+    Days are expected to have different day_order in a group.
+    The matrix follows changes of day items if it is subscribed,
+    days created or deleted later are added by update_day or rebuild
+    """
+
+    kinds = {"lesson": Lesson, "teacher": Teacher, "classroom": Classroom}
+
+    def __init__(self, subscribe=False):
+        self.group_ids = np.zeros(0, dtype=np.int32)
+        # Group id -> row
+        self.group_rows = dict()
+        self.lessons = self.teachers = self.classrooms = None
+        # Count of items of every day
+        self.lengths = None
+        self.rebuild()
+        self.subscribed = subscribe
+        if subscribe:
+            Day.subscribe(self.on_day_change)
+
+    def close(self):
+        if self.subscribed:
+            Day.unsubscribe(self.on_day_change)
+            self.subscribed = False
+
+    def rebuild(self):
+        days = [day for day in Day.objects.values() if isinstance(day, Day)]
+        self.group_ids = np.array(
+            sorted({Day.group_obj.get_raw(day).id for day in days}), dtype=np.int32
+        )
+        self.group_rows = {
+            group_id: row for row, group_id in enumerate(self.group_ids.tolist())
+        }
+        max_slots = max((len(day.lessons) for day in days), default=0)
+        shape = (len(self.group_ids), 6, max_slots)
+        self.lessons = np.full(shape, -1, dtype=np.int32)
+        self.classrooms = np.full(shape, -1, dtype=np.int32)
+        self.lengths = np.zeros(shape[:2], dtype=np.int32)
+        for day in days:
+            row = self.group_rows[Day.group_obj.get_raw(day).id]
+            column = day.day_order - 1
+            count = len(day.lessons)
+            self.lessons[row, column, :count] = [lesson.id for lesson in day.lessons]
+            self.classrooms[row, column, :count] = [
+                classroom.id for classroom in day.classrooms
+            ]
+            self.lengths[row, column] = count
+        self.teachers = self.get_teacher_ids(self.lessons)
+
+    @staticmethod
+    def get_teacher_ids(lesson_ids):
+        """
+        :param lesson_ids: array of lesson ids
+        :return: array of the same shape with ids of teachers of the lessons
+        """
+        lessons = [obj for obj in Lesson.objects.values() if isinstance(obj, Lesson)]
+        size = max(
+            max((lesson.id for lesson in lessons), default=0),
+            int(lesson_ids.max(initial=0)),
+        )
+        lesson_teachers = np.full(size + 1, -1, dtype=np.int32)
+        for lesson in lessons:
+            lesson_teachers[lesson.id] = lesson.teacher.id
+        return np.where(
+            lesson_ids > 0, lesson_teachers[np.maximum(lesson_ids, 0)], -1
+        ).astype(np.int32)
+
+    def get_array(self, kind):
+        """
+        :param kind: "lesson", "teacher" or "classroom"
+        """
+        return getattr(self, kind + "s")
+
+    # Inserts an empty row of the group, so rows stay sorted by group id
+    def _add_group(self, group_id):
+        row = int(np.searchsorted(self.group_ids, group_id))
+        self.group_ids = np.insert(self.group_ids, row, np.int32(group_id))
+        self.group_rows = {
+            group_id: row for row, group_id in enumerate(self.group_ids.tolist())
+        }
+        for name in ("lessons", "teachers", "classrooms"):
+            setattr(self, name, np.insert(getattr(self, name), row, -1, axis=0))
+        self.lengths = np.insert(self.lengths, row, 0, axis=0)
+        return row
+
+    def _add_slots(self, count):
+        for name in ("lessons", "teachers", "classrooms"):
+            array = getattr(self, name)
+            setattr(
+                self,
+                name,
+                np.pad(array, ((0, 0), (0, 0), (0, count)), constant_values=-1),
+            )
+
+    # Writes all items of the day, the arrays grow if it is needed
+    def update_day(self, day):
+        group_id = Day.group_obj.get_raw(day).id
+        row = self.group_rows.get(group_id)
+        if row is None:
+            row = self._add_group(group_id)
+        count = len(day.lessons)
+        if count > self.lessons.shape[2]:
+            self._add_slots(count - self.lessons.shape[2])
+        column = day.day_order - 1
+        for array, ids in (
+            (self.lessons, [lesson.id for lesson in day.lessons]),
+            (self.teachers, [Day._get_teacher_id(lesson) for lesson in day.lessons]),
+            (self.classrooms, [classroom.id for classroom in day.classrooms]),
+        ):
+            array[row, column, :count] = ids
+            array[row, column, count:] = -1
+        self.lengths[row, column] = count
+
+    def on_day_change(self, change):
+        self.update_day(change.day)
+
+    def count(self, kind):
+        """
+        Counts day items of every lesson, teacher or classroom
+        :return: dict object -> count
+        """
+        cls = self.kinds[kind]
+        array = self.get_array(kind)
+        ids, counts = np.unique(array[array > 0], return_counts=True)
+        return {
+            cls.objects.get(i, cls.null): count
+            for i, count in zip(ids.tolist(), counts.tolist())
+        }
+
+    def find(self, kind, obj):
+        """
+        :return: list of (group, day_order, slot) of day items with the object
+        """
+        rows, columns, slots = np.nonzero(self.get_array(kind) == obj.id)
+        return [
+            (Group.objects.get(group_id, Group.null), column + 1, slot)
+            for group_id, column, slot in zip(
+                self.group_ids[rows].tolist(), columns.tolist(), slots.tolist()
+            )
+        ]
+
+    def find_duplicates(self, kind):
+        """
+        Finds resources that are used by several groups in the same slot of the same day
+        :param kind: "teacher" or "classroom"
+        :return: list of (day_order, slot, resource_id, group ids)
+                 sorted by day_order, slot and resource_id
+        """
+        # (days, slots, groups)
+        by_slot = np.moveaxis(self.get_array(kind), 0, -1)
+        order = np.argsort(by_slot, axis=-1, kind="stable")
+        ordered = np.take_along_axis(by_slot, order, axis=-1)
+        same = (ordered[..., 1:] == ordered[..., :-1]) & (ordered[..., 1:] > 0)
+        # Items that have an equal neighbour after sorting are duplicates
+        duplicated = np.zeros(ordered.shape, dtype=bool)
+        duplicated[..., 1:] |= same
+        duplicated[..., :-1] |= same
+        columns, slots, positions = np.nonzero(duplicated)
+        if not len(columns):
+            return []
+        resources = ordered[columns, slots, positions]
+        group_ids = self.group_ids[order[columns, slots, positions]]
+        starts = np.ones(len(columns), dtype=bool)
+        starts[1:] = (
+            (columns[1:] != columns[:-1])
+            | (slots[1:] != slots[:-1])
+            | (resources[1:] != resources[:-1])
+        )
+        starts = np.flatnonzero(starts)
+        return [
+            (column + 1, slot, resource_id, groups.tolist())
+            for column, slot, resource_id, groups in zip(
+                columns[starts].tolist(),
+                slots[starts].tolist(),
+                resources[starts].tolist(),
+                np.split(group_ids, starts[1:]),
+            )
+        ]
+
+    def find_conflicts(self):
+        """
+        Returns all teacher and classroom double bookings
+        :return: list of Conflict
+        """
+        result = []
+        for kind in ("teacher", "classroom"):
+            cls = self.kinds[kind]
+            for day_order, slot, resource_id, group_ids in self.find_duplicates(kind):
+                result.append(
+                    Conflict(
+                        kind,
+                        day_order,
+                        slot,
+                        cls.objects.get(resource_id, cls.null),
+                        [Group.objects.get(i, Group.null) for i in group_ids],
+                    )
+                )
+        return result
+
+
+def find_conflicts(schedule=None):
+    """
+    Returns all teacher and classroom double bookings of the loaded schedule
+    :param schedule: opened Schedule, groups that are not loaded yet
+                     in lazy mode are loaded first
+    :return: list of Conflict
+    """
+    if schedule is not None:
+        schedule.load_all()
+    return ScheduleMatrix().find_conflicts()
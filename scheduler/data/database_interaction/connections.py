@@ -0,0 +1,157 @@
+import atexit
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from scheduler.config import DB_PRAGMAS
+from .instrumentation import profiler
+
+
+class ConnectionManager:
+    """
+    Keeps one long-lived connection per database file and per thread,
+    so orm calls do not reopen the file every time.
+    """
+
+    def __init__(self, pragmas=None):
+        self.pragmas = dict(DB_PRAGMAS if pragmas is None else pragmas)
+        self._lock = threading.Lock()
+        # filename -> {thread id: connection}
+        self._connections = dict()
+        # Depth of nested transactions of the current thread by filename
+        self._local = threading.local()
+
+    def _open(self, filename):
+        con = sqlite3.connect(filename, check_same_thread=False)
+        for pragma, value in self.pragmas.items():
+            con.execute(f"PRAGMA {pragma} = {value}")
+        if profiler.enabled:
+            profiler.on_open(con)
+        return con
+
+    def get(self, filename):
+        """
+        Returns the connection of the current thread to the file,
+        opening it on first use
+        :param filename: full name of the database file
+        """
+        thread_id = threading.get_ident()
+        cons = self._connections.get(filename)
+        if cons is not None and thread_id in cons:
+            return cons[thread_id]
+        con = self._open(filename)
+        with self._lock:
+            self._connections.setdefault(filename, dict())[thread_id] = con
+        return con
+
+    def peek(self, filename):
+        """
+        Returns the connection of the current thread to the file
+        or None if it is not opened
+        """
+        cons = self._connections.get(filename)
+        if cons is None:
+            return None
+        return cons.get(threading.get_ident())
+
+    def get_thread_changes(self):
+        """
+        :return: {connection: count of rows changed by it} for connections
+                 of the current thread to all files
+        """
+        thread_id = threading.get_ident()
+        with self._lock:
+            cons = [
+                cons[thread_id]
+                for cons in self._connections.values()
+                if thread_id in cons
+            ]
+        return {con: con.total_changes for con in cons}
+
+    def is_open(self, filename):
+        return bool(self._connections.get(filename))
+
+    def _depths(self):
+        if not hasattr(self._local, "depths"):
+            self._local.depths = dict()
+        return self._local.depths
+
+    @contextmanager
+    def transaction(self, filename):
+        """
+        Yields the connection to the file. Changes are committed when
+        the outermost transaction of the thread ends and rolled back
+        if it ends with an exception
+        :param filename: full name of the database file
+        """
+        con = self.get(filename)
+        depths = self._depths()
+        depths[filename] = depths.get(filename, 0) + 1
+        try:
+            yield con
+        except BaseException:
+            depths[filename] -= 1
+            if not depths[filename]:
+                con.rollback()
+            raise
+        depths[filename] -= 1
+        if not depths[filename]:
+            con.commit()
+
+    # Sets the callback of sqlite statements on all opened connections
+    def set_trace_callback(self, callback):
+        with self._lock:
+            cons = [con for cons in self._connections.values() for con in cons.values()]
+        for con in cons:
+            con.set_trace_callback(callback)
+
+    def close(self, filename):
+        """
+        Closes connections of all threads to the file
+        :param filename: full name of the database file
+        """
+        with self._lock:
+            cons = self._connections.pop(filename, dict())
+        for con in cons.values():
+            con.close()
+
+    def release(self, filename):
+        """
+        Closes connections of all threads to the file and moves changes
+        kept in its wal journal into it, the journal files are removed.
+        It must be called before the file is renamed or removed
+        :param filename: full name of the database file
+        """
+        self.close(filename)
+        con = sqlite3.connect(filename)
+        try:
+            con.execute("PRAGMA journal_mode = DELETE")
+        finally:
+            con.close()
+
+    def close_thread(self):
+        """
+        Closes connections of the current thread to all files.
+        A thread that used connections must call it before it ends,
+        otherwise they stay open and could be given to a new thread with its id
+        """
+        thread_id = threading.get_ident()
+        with self._lock:
+            cons = [
+                cons.pop(thread_id)
+                for cons in self._connections.values()
+                if thread_id in cons
+            ]
+        for con in cons:
+            con.close()
+        self._depths().clear()
+
+    def close_all(self):
+        with self._lock:
+            filenames = list(self._connections)
+        for filename in filenames:
+            self.close(filename)
+
+
+connections = ConnectionManager()
+atexit.register(connections.close_all)
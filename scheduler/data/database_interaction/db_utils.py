@@ -1,9 +1,10 @@
 import glob
 import os
-import sqlite3
 
 import scheduler.data.database_interaction.sql_commands as sql_commands
 from scheduler.config import STORE_DIR
+from .connections import connections
+from .instrumentation import profiler, instrumented
 
 
 class DatabaseAlreadyExistsException(Exception):
@@ -22,12 +23,13 @@ def _get_db_filename(name):
 
 
 def _create(commands, filename):
-    with sqlite3.connect(filename) as con:
+    with connections.transaction(filename) as con:
         cur = con.cursor()
         for command in commands:
             cur.execute(command)
 
 
+@instrumented
 def db_exists(name: str):
     return os.path.exists(_get_db_filename(name))
 
@@ -37,14 +39,45 @@ def check_db_exists(func):
     Decorator. Checks whether database with name = {name} exists
     """
 
+    call_name = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
     def wrapper(name, *args, **kwargs):
-        if not db_exists(name):
+        filename = _get_db_filename(name)
+        # An open connection means that the file exists, so stat is skipped
+        if not connections.is_open(filename) and not os.path.exists(filename):
             raise DatabaseDoesNotExist
-        return func(_get_db_filename(name), *args, **kwargs)
+        if not profiler.enabled:
+            return func(filename, *args, **kwargs)
+        return profiler.call(call_name, func, (filename, *args), kwargs)
 
     return wrapper
 
 
+@check_db_exists
+def transaction(name):
+    """
+    Returns context manager. Orm calls made inside it
+    are committed together when it ends
+    :param name: DB name
+    """
+
+    return connections.transaction(name)
+
+
+@check_db_exists
+def create_index(name, table, field):
+    """
+    Creates index on the field of the table if it does not exist
+    :param name: DB name
+    :param table: name of the table in the db
+    :param field: name of the indexed field
+    """
+
+    with connections.transaction(name) as con:
+        con.execute(sql_commands.CREATE_INDEX % (table, field, table, field))
+
+
+@instrumented
 def create_db_with_models(name: str, *models):
     """
     Creates database with schedule structure
@@ -75,9 +108,45 @@ def delete_db(name):
     """
 
     filename = _get_db_filename(name)
+    connections.release(filename)
     os.remove(filename)
 
 
+@check_db_exists
+def rename_db(name, new_name):
+    """
+    Renames database with name = {name} to {new_name}
+    :param name: DB name
+    :param new_name: new DB name
+    :raises: DatabaseDoesNotExist
+    :raises: DatabaseAlreadyExistsException
+    """
+
+    if db_exists(new_name):
+        raise DatabaseAlreadyExistsException
+    filename = _get_db_filename(name)
+    connections.release(filename)
+    os.rename(filename, _get_db_filename(new_name))
+
+
+def close_all_connections():
+    """
+    Closes cached connections of all threads to all dbs
+    """
+
+    connections.close_all()
+
+
+def close_thread_connections():
+    """
+    Closes connections of the current thread to all dbs.
+    Worker threads call it before they end
+    """
+
+    connections.close_thread()
+
+
+@instrumented
 def get_dbs():
     """
     Returns names of all dbs in store dir
@@ -0,0 +1,256 @@
+"""
+Opt-in statistics of database calls: count of sql statements, rows touched,
+connection opens and wall time for every orm and db_utils entry point,
+grouped by action and by the call site outside of this package.
+
+It is enabled by SCHEDULER_DB_STATS=1, then the summary is printed at exit,
+or temporarily by the recording() context manager.
+When it is disabled an entry point costs one attribute check.
+"""
+import atexit
+import sqlite3
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from scheduler.config import DB_STATS
+
+# Frames of these modules are skipped when the call site is searched
+_PACKAGE = __name__.rsplit(".", 1)[0]
+# Action of the calls made outside of any action
+NO_ACTION = "-"
+
+
+class CallStats:
+    __slots__ = ("calls", "statements", "rows", "opens", "seconds")
+
+    def __init__(self):
+        self.calls = 0
+        self.statements = 0
+        self.rows = 0
+        self.opens = 0
+        self.seconds = 0.0
+
+    def add(self, other):
+        self.calls += other.calls
+        self.statements += other.statements
+        self.rows += other.rows
+        self.opens += other.opens
+        self.seconds += other.seconds
+
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        # Current action and call of the thread
+        self._local = threading.local()
+        # (action, entry point, call site) -> CallStats
+        self.stats = defaultdict(CallStats)
+
+    def enable(self):
+        from .connections import connections
+
+        self.enabled = True
+        connections.set_trace_callback(self._trace)
+
+    def disable(self):
+        from .connections import connections
+
+        self.enabled = False
+        connections.set_trace_callback(None)
+
+    def clear(self):
+        with self._lock:
+            self.stats.clear()
+
+    def get_action(self):
+        actions = getattr(self._local, "actions", None)
+        return "/".join(actions) if actions else NO_ACTION
+
+    def _get_current(self):
+        return getattr(self._local, "current", None)
+
+    def _record(self, name, site, stats, action=None):
+        if action is None:
+            action = self.get_action()
+        with self._lock:
+            self.stats[action, name, site].add(stats)
+
+    # Sqlite calls it for every executed statement
+    def _trace(self, statement):
+        current = self._get_current()
+        if current is not None:
+            current.statements += 1
+        else:
+            # Commits of transaction() blocks happen after the calls inside them
+            stats = CallStats()
+            stats.statements = 1
+            self._record("unattributed", "", stats)
+
+    # ConnectionManager calls it when a connection is opened
+    def on_open(self, con):
+        con.set_trace_callback(self._trace)
+        current = self._get_current()
+        if current is not None:
+            current.opens += 1
+
+    @staticmethod
+    def _get_site():
+        frame = sys._getframe(1)
+        while frame is not None and frame.f_globals.get("__name__", "").startswith(
+            _PACKAGE
+        ):
+            frame = frame.f_back
+        if frame is None:
+            return ""
+        return (
+            f"{frame.f_globals.get('__name__')}:{frame.f_lineno} "
+            f"{frame.f_code.co_name}"
+        )
+
+    def call(self, name, func, args, kwargs):
+        """
+        Calls func and records its statistics under name.
+        Calls made inside another recorded call are added to the outer one.
+        Rows changed by connections of the thread to any db are counted as touched
+        """
+        if self._get_current() is not None:
+            return func(*args, **kwargs)
+        from .connections import connections
+
+        stats = CallStats()
+        stats.calls = 1
+        changes = connections.get_thread_changes()
+        site = self._get_site()
+        self._local.current = stats
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+            if isinstance(result, list):
+                stats.rows += len(result)
+            elif isinstance(result, sqlite3.Cursor):
+                result = self._count_rows(name, site, self.get_action(), result)
+            return result
+        finally:
+            stats.seconds = time.perf_counter() - start
+            self._local.current = None
+            stats.rows += sum(
+                total - changes.get(con, 0)
+                for con, total in connections.get_thread_changes().items()
+            )
+            self._record(name, site, stats)
+
+    # Rows of a cursor are read after the call, they are recorded when it is exhausted
+    def _count_rows(self, name, site, action, cursor):
+        stats = CallStats()
+        try:
+            for row in cursor:
+                stats.rows += 1
+                yield row
+        finally:
+            self._record(name, site, stats, action)
+
+    @contextmanager
+    def action(self, name):
+        """
+        Calls made inside the block are grouped under the action.
+        Nested actions are joined by "/"
+        """
+        if not self.enabled:
+            yield
+            return
+        if not hasattr(self._local, "actions"):
+            self._local.actions = []
+        self._local.actions.append(name)
+        try:
+            yield
+        finally:
+            self._local.actions.pop()
+
+    def get_totals(self, key):
+        """
+        :param key: function of (action, name, site) that gives the group
+        :return: group -> CallStats
+        """
+        totals = defaultdict(CallStats)
+        with self._lock:
+            for item, stats in self.stats.items():
+                totals[key(*item)].add(stats)
+        return totals
+
+    def summary(self):
+        lines = [
+            f"{'action / entry point':<64} {'calls':>7} {'stmts':>7} "
+            f"{'rows':>8} {'opens':>5} {'ms':>9}"
+        ]
+
+        def add_line(title, stats):
+            lines.append(
+                f"{title:<64} {stats.calls:>7} {stats.statements:>7} "
+                f"{stats.rows:>8} {stats.opens:>5} {stats.seconds * 1000:>9.2f}"
+            )
+
+        actions = self.get_totals(lambda action, name, site: action)
+        entry_points = self.get_totals(lambda action, name, site: (action, name))
+        for action in sorted(actions):
+            add_line(action, actions[action])
+            for (entry_action, name), stats in sorted(entry_points.items()):
+                if entry_action == action:
+                    add_line("  " + name, stats)
+
+        lines.append("")
+        lines.append("slowest call sites")
+        sites = self.get_totals(lambda action, name, site: (site, name))
+        slowest = sorted(sites.items(), key=lambda item: -item[1].seconds)[:10]
+        for (site, name), stats in slowest:
+            add_line(f"  {name} {site}", stats)
+        return "\n".join(lines)
+
+    def dump(self, file=None):
+        print(self.summary(), file=file or sys.stderr)
+
+
+profiler = Profiler()
+
+
+@contextmanager
+def recording():
+    """
+    Enables the statistics inside the block and yields the profiler,
+    statistics of the previous recordings are cleared
+    """
+    was_enabled = profiler.enabled
+    profiler.clear()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        if not was_enabled:
+            profiler.disable()
+
+
+def instrumented(func):
+    """
+    Decorator. Records statistics of the calls of func when the profiler is enabled
+    """
+    name = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+    def wrapper(*args, **kwargs):
+        if not profiler.enabled:
+            return func(*args, **kwargs)
+        return profiler.call(name, func, args, kwargs)
+
+    return wrapper
+
+
+def action(name):
+    return profiler.action(name)
+
+
+# No connections are opened yet, they get the trace callback when they are
+if DB_STATS:
+    profiler.enabled = True
+    atexit.register(profiler.dump)
@@ -1,6 +1,16 @@
-import sqlite3
+from functools import lru_cache
+
+from .connections import connections
 from .db_utils import check_db_exists
-from .sql_commands import SELECT_ALL, UPDATE_BY_ID, INSERT, DELETE_BY_ID
+from .sql_commands import (
+    SELECT_ALL,
+    SELECT_WHERE,
+    SELECT_ORDERED,
+    SELECT_MAX_ID,
+    UPDATE_BY_ID,
+    INSERT,
+    DELETE_BY_ID,
+)
 
 
 @check_db_exists
@@ -13,41 +23,95 @@ def get(db_name: str, table: str, fields="*"):
                    in the same order
     :return: values of the fields
     """
-    with sqlite3.connect(db_name) as con:
-        cur = con.cursor()
-        command = SELECT_ALL % (", ".join(fields), table)
-        return cur.execute(command).fetchall()
+    cur = connections.get(db_name).cursor()
+    command = SELECT_ALL % (", ".join(fields), table)
+    return cur.execute(command).fetchall()
+
+
+@check_db_exists
+def get_where(db_name: str, table: str, fields: tuple[str], field: str, value):
+    """
+    Takes values of *fields from the rows where {field} = {value}
+    :param db_name: name of the database
+    :param table: name of the table in the db
+    :param fields: values of these fields will be returned
+                   in the same order
+    :param field: name of the field to filter by
+    :param value: value of the field
+    :return: values of the fields
+    """
+    cur = connections.get(db_name).cursor()
+    command = SELECT_WHERE % (", ".join(fields), table, field)
+    return cur.execute(command, (value,)).fetchall()
+
+
+@check_db_exists
+def iterate(db_name: str, table: str, fields: tuple[str], order_by: tuple[str]):
+    """
+    Takes values of *fields ordered by *order_by.
+    Rows are read from the db while they are iterated, so they are not all
+    kept in memory
+    :param db_name: name of the database
+    :param table: name of the table in the db
+    :param fields: values of these fields will be returned
+                   in the same order
+    :param order_by: names of the fields to order by
+    :return: iterator over values of the fields
+    """
+    cur = connections.get(db_name).cursor()
+    command = SELECT_ORDERED % (", ".join(fields), table, ", ".join(order_by))
+    return cur.execute(command)
+
+
+@check_db_exists
+def get_max_id(db_name: str, table: str):
+    """
+    Returns the biggest id of the table or 0 if it is empty
+    :param db_name: name of the database
+    :param table: name of the table in the db
+    """
+    cur = connections.get(db_name).execute(SELECT_MAX_ID % table)
+    return cur.fetchone()[0] or 0
+
+
+@lru_cache(maxsize=None)
+def _update_command(table: str, fields: tuple[str]):
+    return UPDATE_BY_ID % (table, ", ".join(f"{key} = ?" for key in fields))
+
+
+@lru_cache(maxsize=None)
+def _insert_command(table: str, fields: tuple[str]):
+    return INSERT % (table, ", ".join(fields), ", ".join("?" * len(fields)))
+
+
+@lru_cache(maxsize=None)
+def _delete_command(table: str):
+    return DELETE_BY_ID % table
 
 
 @check_db_exists
 def update_by_ids(
     db_name: str,
     table: str,
-    element_id: int,
+    ids: tuple[int],
     fields: tuple[str],
     values_sets: tuple[tuple[str]],
 ):
     """
-    Sets field values of the table in the db with name = {db_name}
-    to *values
+    Sets field values of the elements with ids of the table
+    in the db with name = {db_name} to values_sets
     :param db_name: name of the database
     :param table: name of the table in the db
-    :param element_id: id of the element in the table
+    :param ids: ids of the elements in the table
     :param fields: all fields of the table
-    :param values_sets: values sets for fields
+    :param values_sets: values sets for fields, one for every id
     """
-    with sqlite3.connect(db_name) as con:
-        cur = con.cursor()
-        for values in values_sets:
-            new_vals = []
-            for key, val in zip(fields, values):
-                if isinstance(val, int):
-                    new_vals.append(f"{key} = {val}")
-                else:
-                    val = val.replace('"', "")
-                    new_vals.append(f'{key} = "{val}"')
-            command = UPDATE_BY_ID % (table, ", ".join(new_vals), element_id)
-            cur.execute(command)
+    command = _update_command(table, tuple(fields))
+    with connections.transaction(db_name) as con:
+        con.executemany(
+            command,
+            ((*values, element_id) for element_id, values in zip(ids, values_sets)),
+        )
 
 
 @check_db_exists
@@ -63,7 +127,7 @@ def update_by_id(
     :param fields: all fields of the table
     :param values: values for fields
     """
-    update_by_ids(db_name, table, element_id, fields, (values,))
+    update_by_ids(db_name, table, (element_id,), fields, (values,))
 
 
 @check_db_exists
@@ -78,18 +142,9 @@ def insert_many(
     :param fields: all fields of the table
     :param values_sets: values sets for fields
     """
-    with sqlite3.connect(db_name) as con:
-        cur = con.cursor()
-        for values in values_sets:
-            new_vals = []
-            for val in values:
-                if isinstance(val, int):
-                    new_vals.append(str(val))
-                else:
-                    val = val.replace('"', "")
-                    new_vals.append(f'"{val}"')
-            command = INSERT % (table, ", ".join(fields), ", ".join(new_vals))
-            cur.execute(command)
+    command = _insert_command(table, tuple(fields))
+    with connections.transaction(db_name) as con:
+        con.executemany(command, values_sets)
 
 
 @check_db_exists
@@ -114,11 +169,9 @@ def delete_by_ids(db_name: str, table: str, ids: tuple[int]):
     :param table: name of the table in the db
     :param ids: ids of elements in the table
     """
-    with sqlite3.connect(db_name) as con:
-        cur = con.cursor()
-        for element_id in ids:
-            command = DELETE_BY_ID % (table, element_id)
-            cur.execute(command)
+    command = _delete_command(table)
+    with connections.transaction(db_name) as con:
+        con.executemany(command, ((element_id,) for element_id in ids))
 
 
 @check_db_exists
@@ -0,0 +1,168 @@
+from .connections import connections
+from .db_utils import check_db_exists
+from .sql_commands import (
+    CREATE_SLOTS_TABLE,
+    CREATE_SLOTS_CLASSROOM_INDEX,
+    CREATE_SLOTS_TEACHER_INDEX,
+    TABLE_EXISTS,
+    SLOTS_TABLE,
+    SELECT_SLOTS,
+    SELECT_GROUP_SLOTS,
+    INSERT_SLOT,
+    DELETE_DAY_SLOTS,
+    UPDATE_SLOTS_TEACHER,
+    SELECT_SLOT_LESSON_TEACHERS,
+    SELECT_SLOT_COUNTS,
+    SELECT_TEACHER_SLOTS,
+    SELECT_GROUPS_WITH_TEACHER,
+    SELECT_GROUP_ITEMS,
+)
+
+
+@check_db_exists
+def create_slot_table(db_name: str):
+    """
+    Creates table with day items and its indexes
+    in the db with name = {db_name}
+    :param db_name: name of the database
+    """
+    with connections.transaction(db_name) as con:
+        con.execute(CREATE_SLOTS_TABLE)
+        con.execute(CREATE_SLOTS_CLASSROOM_INDEX)
+        con.execute(CREATE_SLOTS_TEACHER_INDEX)
+
+
+@check_db_exists
+def has_slot_table(db_name: str):
+    """
+    Checks whether day items of the db with name = {db_name}
+    are stored in the slot table
+    :param db_name: name of the database
+    """
+    cur = connections.get(db_name).execute(TABLE_EXISTS, (SLOTS_TABLE,))
+    return cur.fetchone() is not None
+
+
+@check_db_exists
+def get_slots(db_name: str):
+    """
+    Returns (day_id, slot, lesson_id, classroom_id) of all day items
+    ordered by day and slot
+    :param db_name: name of the database
+    """
+    return connections.get(db_name).execute(SELECT_SLOTS).fetchall()
+
+
+@check_db_exists
+def get_slot_counts(
+    db_name: str, day_order: int, slot: int, skipped_groups: tuple[int]
+):
+    """
+    Returns (classroom_id, lesson_id, count) of the day items in the slot,
+    count is the number of items with the classroom and the lesson
+    :param db_name: name of the database
+    :param day_order: order of the day in the week
+    :param slot: index of the day item
+    :param skipped_groups: ids of groups whose days are not counted
+    """
+    skipped_groups = tuple(skipped_groups)
+    command = SELECT_SLOT_COUNTS % ", ".join("?" * len(skipped_groups))
+    cur = connections.get(db_name).execute(command, (day_order, slot, *skipped_groups))
+    return cur.fetchall()
+
+
+@check_db_exists
+def get_group_slots(db_name: str, group_id: int):
+    """
+    Returns (day_id, slot, lesson_id, classroom_id) of the day items
+    of the group ordered by day and slot
+    :param db_name: name of the database
+    :param group_id: id of the group
+    """
+    cur = connections.get(db_name).execute(SELECT_GROUP_SLOTS, (group_id,))
+    return cur.fetchall()
+
+
+@check_db_exists
+def replace_slots(db_name: str, day_ids: tuple[int], rows: tuple[tuple[int]]):
+    """
+    Replaces all day items of the days with day_ids by rows
+    :param db_name: name of the database
+    :param day_ids: ids of the days
+    :param rows: (day_id, slot, day_order, lesson_id, teacher_id, classroom_id)
+    """
+    with connections.transaction(db_name) as con:
+        con.executemany(DELETE_DAY_SLOTS, ((day_id,) for day_id in day_ids))
+        con.executemany(INSERT_SLOT, rows)
+
+
+@check_db_exists
+def delete_slots(db_name: str, day_ids: tuple[int]):
+    """
+    Deletes all day items of the days with day_ids
+    :param db_name: name of the database
+    :param day_ids: ids of the days
+    """
+    with connections.transaction(db_name) as con:
+        con.executemany(DELETE_DAY_SLOTS, ((day_id,) for day_id in day_ids))
+
+
+@check_db_exists
+def update_slot_teachers(db_name: str, lesson_teachers: tuple[tuple[int]]):
+    """
+    Teachers are stored in the slot table to be indexed,
+    so they have to be updated when a lesson changes its teacher
+    :param db_name: name of the database
+    :param lesson_teachers: (teacher_id, lesson_id) pairs
+    """
+    with connections.transaction(db_name) as con:
+        con.executemany(UPDATE_SLOTS_TEACHER, lesson_teachers)
+
+
+@check_db_exists
+def get_slot_lesson_teachers(db_name: str):
+    """
+    Returns (lesson_id, teacher_id) pairs stored in the slot table,
+    so stale teachers could be found without rewriting all rows
+    :param db_name: name of the database
+    """
+    return connections.get(db_name).execute(SELECT_SLOT_LESSON_TEACHERS).fetchall()
+
+
+@check_db_exists
+def get_teacher_slots(db_name: str, teacher_id: int):
+    """
+    Returns (group_id, day_order, slot, lesson_id, classroom_id)
+    of all lessons of the teacher
+    :param db_name: name of the database
+    :param teacher_id: id of the teacher
+    """
+    cur = connections.get(db_name).execute(SELECT_TEACHER_SLOTS, (teacher_id,))
+    return cur.fetchall()
+
+
+@check_db_exists
+def get_groups_with_teacher(db_name: str, teacher_id: int, day_order: int, slot: int):
+    """
+    Returns ids of groups that have a lesson of the teacher
+    in the slot of the day
+    :param db_name: name of the database
+    :param teacher_id: id of the teacher
+    :param day_order: order of the day in the week
+    :param slot: index of the day item
+    """
+    cur = connections.get(db_name).execute(
+        SELECT_GROUPS_WITH_TEACHER, (day_order, slot, teacher_id)
+    )
+    return [group_id for group_id, in cur.fetchall()]
+
+
+@check_db_exists
+def iterate_group_items(db_name: str):
+    """
+    Returns iterator over (group_id, day_order, lesson_id, classroom_id)
+    of all day items ordered by group, day and slot.
+    Rows are read from the db while they are iterated
+    :param db_name: name of the database
+    """
+    return connections.get(db_name).cursor().execute(SELECT_GROUP_ITEMS)
@@ -2,6 +2,71 @@
 
 CREATE_DB_TABLE = "CREATE TABLE IF NOT EXISTS %s(%s)"
 SELECT_ALL = "SELECT %s FROM %s"
-UPDATE_BY_ID = "UPDATE %s SET %s WHERE id = %s;"
+SELECT_WHERE = "SELECT %s FROM %s WHERE %s = ?"
+SELECT_ORDERED = "SELECT %s FROM %s ORDER BY %s"
+SELECT_MAX_ID = "SELECT MAX(id) FROM %s"
+CREATE_INDEX = "CREATE INDEX IF NOT EXISTS %s_%s ON %s(%s)"
+
+# Parameterized commands, values are passed to executemany
+UPDATE_BY_ID = "UPDATE %s SET %s WHERE id = ?"
 INSERT = "INSERT INTO %s(%s) VALUES(%s)"
-DELETE_BY_ID = "DELETE from %s where id = %s;"
+DELETE_BY_ID = "DELETE FROM %s WHERE id = ?"
+
+# Normalized storage of Day lessons and classrooms
+SLOTS_TABLE = "day_slots"
+CREATE_SLOTS_TABLE = f"""CREATE TABLE IF NOT EXISTS {SLOTS_TABLE}(
+    day_id INTEGER NOT NULL,
+    slot INTEGER NOT NULL,
+    day_order INTEGER NOT NULL,
+    lesson_id INTEGER NOT NULL,
+    teacher_id INTEGER NOT NULL,
+    classroom_id INTEGER NOT NULL,
+    PRIMARY KEY (day_id, slot)
+)"""
+CREATE_SLOTS_CLASSROOM_INDEX = (
+    f"CREATE INDEX IF NOT EXISTS {SLOTS_TABLE}_classroom "
+    f"ON {SLOTS_TABLE}(day_order, slot, classroom_id)"
+)
+CREATE_SLOTS_TEACHER_INDEX = (
+    f"CREATE INDEX IF NOT EXISTS {SLOTS_TABLE}_teacher "
+    f"ON {SLOTS_TABLE}(day_order, slot, teacher_id)"
+)
+TABLE_EXISTS = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?"
+SELECT_SLOTS = (
+    f"SELECT day_id, slot, lesson_id, classroom_id FROM {SLOTS_TABLE} "
+    "ORDER BY day_id, slot"
+)
+INSERT_SLOT = (
+    f"INSERT INTO {SLOTS_TABLE}"
+    "(day_id, slot, day_order, lesson_id, teacher_id, classroom_id) "
+    "VALUES(?, ?, ?, ?, ?, ?)"
+)
+SELECT_GROUP_SLOTS = (
+    f"SELECT day_id, slot, lesson_id, classroom_id FROM {SLOTS_TABLE} "
+    "WHERE day_id IN (SELECT id FROM days WHERE group_obj = ?) "
+    "ORDER BY day_id, slot"
+)
+SELECT_GROUP_ITEMS = (
+    f"SELECT days.group_obj, days.day_order, s.lesson_id, s.classroom_id "
+    f"FROM {SLOTS_TABLE} AS s JOIN days ON days.id = s.day_id "
+    "ORDER BY days.group_obj, days.day_order, days.id, s.slot"
+)
+DELETE_DAY_SLOTS = f"DELETE FROM {SLOTS_TABLE} WHERE day_id = ?"
+UPDATE_SLOTS_TEACHER = f"UPDATE {SLOTS_TABLE} SET teacher_id = ? WHERE lesson_id = ?"
+SELECT_SLOT_COUNTS = (
+    f"SELECT s.classroom_id, s.lesson_id, COUNT(*) FROM {SLOTS_TABLE} AS s "
+    "JOIN days ON days.id = s.day_id WHERE s.day_order = ? AND s.slot = ? "
+    "AND days.group_obj NOT IN (%s) GROUP BY s.classroom_id, s.lesson_id"
+)
+SELECT_SLOT_LESSON_TEACHERS = (
+    f"SELECT DISTINCT lesson_id, teacher_id FROM {SLOTS_TABLE} WHERE lesson_id > 0"
+)
+SELECT_TEACHER_SLOTS = (
+    f"SELECT days.group_obj, s.day_order, s.slot, s.lesson_id, s.classroom_id "
+    f"FROM {SLOTS_TABLE} AS s JOIN days ON days.id = s.day_id "
+    "WHERE s.teacher_id = ? ORDER BY s.day_order, s.slot"
+)
+SELECT_GROUPS_WITH_TEACHER = (
+    f"SELECT days.group_obj FROM {SLOTS_TABLE} AS s JOIN days ON days.id = s.day_id "
+    "WHERE s.day_order = ? AND s.slot = ? AND s.teacher_id = ?"
+)
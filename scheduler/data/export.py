@@ -0,0 +1,110 @@
+import json
+from collections import defaultdict
+from itertools import groupby
+from operator import itemgetter
+
+import xlsxwriter
+
+from scheduler.data.database_interaction.orm import iterate
+from scheduler.data.database_interaction.slots import (
+    has_slot_table,
+    iterate_group_items,
+)
+from scheduler.data.models.schedule import Day
+from scheduler.data.models.structure import Group, Lesson, Classroom
+
+
+def iterate_group_days(name):
+    """
+    Reads day items of the schedule straight from the db, no models are created
+    :param name: name of the schedule
+    :return: iterator over (group_id, day_order, [(lesson_id, classroom_id), ...])
+             ordered by group and day
+    """
+    if has_slot_table(name):
+        for (group_id, day_order), rows in groupby(
+            iterate_group_items(name), key=itemgetter(0, 1)
+        ):
+            yield group_id, day_order, [row[2:] for row in rows]
+        return
+    for group_id, day_order, lessons, classrooms in iterate(
+        name,
+        Day.get_table_name(),
+        ("group_obj", "day_order", "lessons", "classrooms"),
+        ("group_obj", "day_order", "id"),
+    ):
+        yield group_id, day_order, list(
+            zip(json.loads(lessons), json.loads(classrooms))
+        )
+
+
+def write_group(worksheet, row, group, week, formats, names):
+    """
+    Writes the week of the group starting from the row.
+    Cells are not merged: xlsxwriter keeps every merged range in memory
+    :param week: {day_order: [(lesson_id, classroom_id), ...]}
+    :param formats: {"group": Format, "day": Format}
+    :param names: {"lessons": {id: name}, "classrooms": {id: name}}
+    :return: the first row after the group
+    """
+    empty = str(Lesson.null)
+    worksheet.write(row, 0, str(group), formats["group"])
+    row += 2
+    for day_order, day_name in sorted(Day.day_names.items()):
+        worksheet.write(row, 0, day_name, formats["day"])
+        row += 1
+        for i, (lesson_id, classroom_id) in enumerate(week.get(day_order, ())):
+            worksheet.write(row, 0, i + 1)
+            worksheet.write(row, 1, names["lessons"].get(lesson_id, empty))
+            worksheet.write(row, 2, names["classrooms"].get(classroom_id, empty))
+            row += 1
+        row += 1
+    return row
+
+
+def export_schedule(name, filename, progress=None):
+    """
+    Writes weeks of all groups of the schedule into the xlsx file one under
+    another. Rows are written in order with constant_memory, so memory does
+    not grow with the number of groups. The schedule db is only read,
+    groups without a week get empty days.
+    It does not use Qt, so it could be run in a worker thread
+    :param name: name of the schedule
+    :param filename: path of the xlsx file
+    :param progress: function(done, total) called after every group
+    :return: number of exported groups
+    """
+    # Managers are copied at once, so they could be changed by the main thread
+    groups = sorted(
+        (group for group in list(Group.objects.values()) if isinstance(group, Group)),
+        key=lambda group: group.id,
+    )
+    names = {
+        "lessons": {i: str(obj) for i, obj in list(Lesson.objects.items()) if i > 0},
+        "classrooms": {
+            i: str(obj) for i, obj in list(Classroom.objects.items()) if i > 0
+        },
+    }
+    days = iterate_group_days(name)
+    next_day = next(days, None)
+    with xlsxwriter.Workbook(filename, {"constant_memory": True}) as workbook:
+        worksheet = workbook.add_worksheet()
+        worksheet.set_column(0, 0, 4)
+        worksheet.set_column(1, 2, 24)
+        formats = {
+            "group": workbook.add_format({"bold": True, "font_size": 14}),
+            "day": workbook.add_format({"bold": True}),
+        }
+        row = 0
+        for i, group in enumerate(groups):
+            # Days of deleted groups are skipped
+            while next_day is not None and next_day[0] < group.id:
+                next_day = next(days, None)
+            week = defaultdict(list)
+            while next_day is not None and next_day[0] == group.id:
+                week[next_day[1]].extend(next_day[2])
+                next_day = next(days, None)
+            row = write_group(worksheet, row, group, week, formats, names)
+            if progress is not None:
+                progress(i + 1, len(groups))
+    return len(groups)
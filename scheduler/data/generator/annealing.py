@@ -0,0 +1,162 @@
+import math
+import random
+import time
+
+from .backtracking import solve
+from .problem import Problem
+
+# Part of the time budget that is given to backtracking to build the start state
+START_BUDGET_PART = 0.3
+# Number of random tries to find a clashing unit to move
+CONFLICT_TRIES = 16
+
+
+class AnnealingState:
+    """
+    Every unit has a time. Clashes are allowed while searching
+    and are counted as the cost:
+    extra units of a group or a teacher at a time and units that have no room
+    """
+
+    def __init__(self, problem: Problem, times):
+        self.problem = problem
+        self.times = list(times)
+        self.rooms = len(problem.room_ids)
+        self.group_load = [[0] * problem.times for _ in problem.group_ids]
+        self.teacher_load = [[0] * problem.times for _ in range(problem.teachers)]
+        self.room_load = [0] * problem.times
+        self.cost = 0
+        for unit, time_slot in enumerate(self.times):
+            self.cost += self._change(unit, time_slot, 1)
+
+    def _change(self, unit, time_slot, d):
+        """
+        Adds (d = 1) or removes (d = -1) the unit at the time
+        :return: change of the cost
+        """
+        group, lesson = self.problem.units[unit]
+        teacher = self.problem.lesson_teachers[lesson]
+        delta = 0
+        load = self.group_load[group]
+        delta += _excess(load[time_slot] + d, 1) - _excess(load[time_slot], 1)
+        load[time_slot] += d
+        if teacher > -1:
+            load = self.teacher_load[teacher]
+            delta += _excess(load[time_slot] + d, 1) - _excess(load[time_slot], 1)
+            load[time_slot] += d
+        delta += _excess(self.room_load[time_slot] + d, self.rooms) - _excess(
+            self.room_load[time_slot], self.rooms
+        )
+        self.room_load[time_slot] += d
+        return delta
+
+    def move(self, unit, time_slot):
+        """
+        Moves the unit to the time
+        :return: change of the cost
+        """
+        delta = self._change(unit, self.times[unit], -1)
+        delta += self._change(unit, time_slot, 1)
+        self.times[unit] = time_slot
+        self.cost += delta
+        return delta
+
+    # Checks whether the unit clashes with other units at its time
+    def in_conflict(self, unit):
+        time_slot = self.times[unit]
+        group, lesson = self.problem.units[unit]
+        teacher = self.problem.lesson_teachers[lesson]
+        return (
+            self.group_load[group][time_slot] > 1
+            or (teacher > -1 and self.teacher_load[teacher][time_slot] > 1)
+            or self.room_load[time_slot] > self.rooms
+        )
+
+    # Returns times when the group of the unit has no lessons
+    def free_group_times(self, unit):
+        load = self.group_load[self.problem.units[unit][0]]
+        return [time_slot for time_slot, count in enumerate(load) if not count]
+
+    def to_assignment(self):
+        """
+        Drops units that still clash and gives rooms to the rest
+        :return: (time, room index) or None for every unit
+        """
+        group_busy, teacher_busy = set(), set()
+        room_used = [0] * self.problem.times
+        assignment = [None] * len(self.times)
+        for unit, time_slot in enumerate(self.times):
+            group, lesson = self.problem.units[unit]
+            teacher = self.problem.lesson_teachers[lesson]
+            if (
+                (group, time_slot) in group_busy
+                or (teacher > -1 and (teacher, time_slot) in teacher_busy)
+                or room_used[time_slot] >= self.rooms
+            ):
+                continue
+            group_busy.add((group, time_slot))
+            if teacher > -1:
+                teacher_busy.add((teacher, time_slot))
+            assignment[unit] = (time_slot, room_used[time_slot])
+            room_used[time_slot] += 1
+        return assignment
+
+
+def _excess(count, capacity):
+    return count - capacity if count > capacity else 0
+
+
+def anneal(problem: Problem, time_budget=10.0, seed=None, start_temperature=2.0):
+    """
+    One randomized search chain. It starts from a partial backtracking answer,
+    puts unplaced units at random times and then moves units by simulated
+    annealing until there are no clashes or the time is over.
+    Moves prefer clashing units and times when the group is free
+    :param problem: encoded problem
+    :param time_budget: seconds the chain may run
+    :param seed: seed of the chain
+    :param start_temperature: temperature at the start, it falls linearly to zero
+    :return: (time, room index) or None for every unit
+    """
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    start_budget = time_budget * START_BUDGET_PART
+    assignment = solve(problem, start_budget, seed)
+    if not problem.units or problem.count_unplaced(assignment) == 0:
+        return assignment
+
+    times = [
+        item[0] if item is not None else rng.randrange(problem.times)
+        for item in assignment
+    ]
+    state = AnnealingState(problem, times)
+    best_times, best_cost = list(state.times), state.cost
+    units = len(problem.units)
+    deadline = start + time_budget
+    now = time.perf_counter()
+    while state.cost and now < deadline:
+        temperature = start_temperature * (deadline - now) / (deadline - start)
+        # Time is checked once per batch of moves, it is too slow for every move
+        for _ in range(256):
+            for _ in range(CONFLICT_TRIES):
+                unit = rng.randrange(units)
+                if state.in_conflict(unit):
+                    break
+            old_time = state.times[unit]
+            free_times = state.free_group_times(unit)
+            if free_times:
+                new_time = rng.choice(free_times)
+            else:
+                new_time = rng.randrange(problem.times)
+            delta = state.move(unit, new_time)
+            if delta > 0 and (
+                temperature <= 0 or rng.random() >= math.exp(-delta / temperature)
+            ):
+                state.move(unit, old_time)
+            elif state.cost < best_cost:
+                best_times, best_cost = list(state.times), state.cost
+                if not best_cost:
+                    break
+        now = time.perf_counter()
+    annealed = AnnealingState(problem, best_times).to_assignment()
+    return min(assignment, annealed, key=problem.count_unplaced)
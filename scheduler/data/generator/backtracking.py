@@ -0,0 +1,267 @@
+import heapq
+import random
+import time
+from collections import namedtuple, defaultdict
+
+from .problem import Problem
+
+GenerationResult = namedtuple(
+    "GenerationResult", ("name", "created", "solve_time", "placed", "unplaced")
+)
+
+
+class SearchState:
+    """
+    Busy times of groups, teachers and rooms stored as bitsets.
+    Bit number t of a mask is set if the owner is busy at time t
+    """
+
+    def __init__(self, problem: Problem):
+        self.problem = problem
+        self.all_times = (1 << problem.times) - 1
+        self.group_busy = [0] * len(problem.group_ids)
+        self.teacher_busy = [0] * problem.teachers
+        self.room_busy = [0] * len(problem.room_ids)
+        # Times when every room is busy
+        self.rooms_full = 0 if problem.room_ids else self.all_times
+        self.assignment = [None] * len(problem.units)
+
+        self._neighbours = dict()
+        self.group_units = defaultdict(list)
+        self.teacher_units = defaultdict(list)
+        for unit, (group, lesson) in enumerate(problem.units):
+            self.group_units[group].append(unit)
+            teacher = problem.lesson_teachers[lesson]
+            if teacher > -1:
+                self.teacher_units[teacher].append(unit)
+
+    def domain(self, unit):
+        """
+        Returns bitset of times when the unit could be placed
+        """
+        group, lesson = self.problem.units[unit]
+        busy = self.group_busy[group] | self.rooms_full
+        teacher = self.problem.lesson_teachers[lesson]
+        if teacher > -1:
+            busy |= self.teacher_busy[teacher]
+        return self.all_times & ~busy
+
+    def free_room(self, time):
+        bit = 1 << time
+        for room, busy in enumerate(self.room_busy):
+            if not busy & bit:
+                return room
+        return None
+
+    def assign(self, unit, time, room):
+        bit = 1 << time
+        group, lesson = self.problem.units[unit]
+        teacher = self.problem.lesson_teachers[lesson]
+        self.group_busy[group] |= bit
+        if teacher > -1:
+            self.teacher_busy[teacher] |= bit
+        self.room_busy[room] |= bit
+        if self.free_room(time) is None:
+            self.rooms_full |= bit
+        self.assignment[unit] = (time, room)
+
+    def unassign(self, unit):
+        time, room = self.assignment[unit]
+        mask = ~(1 << time)
+        group, lesson = self.problem.units[unit]
+        teacher = self.problem.lesson_teachers[lesson]
+        self.group_busy[group] &= mask
+        if teacher > -1:
+            self.teacher_busy[teacher] &= mask
+        self.room_busy[room] &= mask
+        self.rooms_full &= mask
+        self.assignment[unit] = None
+
+    def neighbours(self, unit):
+        """
+        Returns units that share a group or a teacher with the unit
+        """
+        group, lesson = self.problem.units[unit]
+        teacher = self.problem.lesson_teachers[lesson]
+        key = group, teacher
+        if key not in self._neighbours:
+            units = set(self.group_units[group])
+            if teacher > -1:
+                units.update(self.teacher_units[teacher])
+            self._neighbours[key] = units
+        return self._neighbours[key]
+
+
+def _times(mask):
+    result = []
+    while mask:
+        low = mask & -mask
+        result.append(low.bit_length() - 1)
+        mask ^= low
+    return result
+
+
+def _place_greedily(state, units, rng):
+    """
+    Places the units at random free times, units with less free times
+    go first. Units without free times are left unplaced
+    :return: number of unplaced units
+    """
+    unplaced = 0
+    for unit in sorted(units, key=lambda unit: state.domain(unit).bit_count()):
+        domain = state.domain(unit)
+        if not domain:
+            unplaced += 1
+            continue
+        time_slot = rng.choice(_times(domain))
+        state.assign(unit, time_slot, state.free_room(time_slot))
+    return unplaced
+
+
+def solve(problem: Problem, time_budget=10.0, seed=None):
+    """
+    Places units with backtracking search. The next unit is the one with
+    the minimum remaining values (MRV). Every time is checked forward:
+    times that leave a unit sharing the group or the teacher without
+    any time are tried last.
+    A unit may be left unplaced, so infeasible problems get a partial answer.
+    The number of unplaced units plus units left without times is a lower bound
+    that prunes branches that can not beat the best assignment found.
+    The first best assignment is a greedy one, and when the time is over
+    the current branch is completed greedily, so big problems that
+    the search can not finish in time still get an answer.
+    :param problem: encoded problem
+    :param time_budget: seconds the search may run
+    :param seed: seed of random tie breaks
+    :return: (time, room index) or None for every unit,
+             the assignment with the least unplaced units found in time
+    """
+    rng = random.Random(seed)
+    deadline = time.perf_counter() + time_budget
+    greedy = SearchState(problem)
+    best_unplaced = _place_greedily(greedy, range(len(problem.units)), rng)
+    best = greedy.assignment
+    if not best_unplaced:
+        return best
+
+    state = SearchState(problem)
+    unassigned = set(range(len(problem.units)))
+    unplaced = 0
+    # Frames of [unit, candidates, index of the next candidate, is unit skipped]
+    # Candidates are (pass, time), pass 0 accepts only times that pass the check
+    stack = []
+    # Heap of (domain size, unit) of unassigned units. Entries are pushed when
+    # domains change, the outdated ones are skipped when they are popped
+    heap = []
+    # Unit -> domain size of its valid entry in the heap
+    sizes = dict()
+
+    def push(unit):
+        size = state.domain(unit).bit_count()
+        if sizes.get(unit) != size:
+            sizes[unit] = size
+            heapq.heappush(heap, (size, unit))
+
+    def push_neighbours(unit):
+        for other in state.neighbours(unit):
+            if other in unassigned:
+                push(other)
+
+    def select_unit():
+        # Domains also change when all rooms get busy or free at a time,
+        # so the size of an entry is checked again before the unit is taken
+        while True:
+            size, unit = heapq.heappop(heap)
+            if unit not in unassigned or sizes.get(unit) != size:
+                continue
+            current = state.domain(unit).bit_count()
+            if current == size:
+                del sizes[unit]
+                return unit
+            sizes[unit] = current
+            heapq.heappush(heap, (current, unit))
+
+    def count_wiped(unit):
+        if state.rooms_full & (1 << state.assignment[unit][0]):
+            units = unassigned
+        else:
+            units = state.neighbours(unit)
+        return sum(
+            1 for other in units if other in unassigned and not state.domain(other)
+        )
+
+    def descend():
+        unit = select_unit()
+        times = _times(state.domain(unit))
+        rng.shuffle(times)
+        candidates = [(0, t) for t in times] + [(1, t) for t in times] + [(2, None)]
+        unassigned.discard(unit)
+        stack.append([unit, candidates, 0, False])
+
+    for unit in unassigned:
+        push(unit)
+    descend()
+    while stack and time.perf_counter() < deadline:
+        frame = stack[-1]
+        unit, candidates, position, skipped = frame
+        if state.assignment[unit] is not None:
+            state.unassign(unit)
+            push_neighbours(unit)
+        if skipped:
+            unplaced -= 1
+            frame[3] = False
+        if position == len(candidates):
+            stack.pop()
+            unassigned.add(unit)
+            push(unit)
+            continue
+        frame[2] += 1
+        check_pass, time_slot = candidates[position]
+        if time_slot is None:
+            if unplaced + 1 >= best_unplaced:
+                continue
+            unplaced += 1
+            frame[3] = True
+        else:
+            state.assign(unit, time_slot, state.free_room(time_slot))
+            push_neighbours(unit)
+            wiped = count_wiped(unit)
+            if check_pass == 0 and wiped:
+                continue
+            if check_pass == 1 and (not wiped or unplaced + wiped >= best_unplaced):
+                continue
+        if unassigned:
+            descend()
+            continue
+        if unplaced < best_unplaced:
+            best, best_unplaced = list(state.assignment), unplaced
+            if not unplaced:
+                return best
+    if stack:
+        # The time is over, units of the current branch that are not placed
+        # are placed greedily
+        missing = [unit for unit, value in enumerate(state.assignment) if value is None]
+        if _place_greedily(state, missing, rng) < best_unplaced:
+            best = state.assignment
+    return best
+
+
+def generate(name, curricula, slots_per_day=6, time_budget=10.0, seed=None):
+    """
+    Generates a clash free schedule and writes it as a new schedule
+    :param name: name of the new schedule
+    :param curricula: {Group: {Lesson: hours per week}}
+    :param slots_per_day: max number of lessons in a day
+    :param time_budget: seconds the search may run
+    :param seed: seed of random tie breaks
+    :return: GenerationResult
+    """
+    problem = Problem.from_models(curricula, slots_per_day)
+    start = time.perf_counter()
+    assignment = solve(problem, time_budget, seed)
+    solve_time = time.perf_counter() - start
+    unplaced = problem.count_unplaced(assignment)
+    created = problem.write_schedule(name, assignment)
+    return GenerationResult(
+        name, created, solve_time, len(assignment) - unplaced, unplaced
+    )
@@ -0,0 +1,50 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .annealing import anneal
+from .backtracking import GenerationResult
+from .problem import Problem
+
+
+def search_parallel(problem: Problem, chains=None, time_budget=10.0, seed=0):
+    """
+    Runs independent annealing chains with different seeds in worker processes
+    :param problem: encoded problem, it is pickled to every worker
+    :param chains: number of chains, by default one per core
+    :param time_budget: seconds every chain may run
+    :param seed: seed of the first chain, next chains use seed + 1, seed + 2, ...
+    :return: assignment of the chain with the least unplaced units
+    """
+    chains = chains or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=chains) as pool:
+        futures = [
+            pool.submit(anneal, problem, time_budget, seed + i) for i in range(chains)
+        ]
+        results = [future.result() for future in futures]
+    return min(results, key=problem.count_unplaced)
+
+
+def generate_parallel(
+    name, curricula, slots_per_day=6, time_budget=10.0, chains=None, seed=0
+):
+    """
+    Generates a schedule with parallel search chains and writes the best one
+    as a new schedule
+    :param name: name of the new schedule
+    :param curricula: {Group: {Lesson: hours per week}}
+    :param slots_per_day: max number of lessons in a day
+    :param time_budget: seconds every chain may run
+    :param chains: number of chains, by default one per core
+    :param seed: seed of the first chain
+    :return: GenerationResult
+    """
+    problem = Problem.from_models(curricula, slots_per_day)
+    start = time.perf_counter()
+    assignment = search_parallel(problem, chains, time_budget, seed)
+    solve_time = time.perf_counter() - start
+    unplaced = problem.count_unplaced(assignment)
+    created = problem.write_schedule(name, assignment)
+    return GenerationResult(
+        name, created, solve_time, len(assignment) - unplaced, unplaced
+    )
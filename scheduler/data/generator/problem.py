@@ -0,0 +1,128 @@
+from scheduler.data.models.core import session
+from scheduler.data.models.schedule import Schedule, Day, Week
+from scheduler.data.models.structure import Group, Classroom
+
+DAYS_IN_WEEK = 6
+
+
+class Problem:
+    """
+    Compact encoding of a timetable problem. It contains only ints and tuples,
+    so it is cheap to copy and to pickle.
+
+    Times are numbered day by day: time = (day_order - 1) * slots_per_day + slot.
+    Every unit is one hour of a lesson of a group that needs a time and a classroom
+    """
+
+    def __init__(
+        self, slots_per_day, group_ids, lesson_ids, lesson_teachers, room_ids, units
+    ):
+        self.slots_per_day = slots_per_day
+        self.times = DAYS_IN_WEEK * slots_per_day
+        # Database ids by indexes used in the encoding
+        self.group_ids = tuple(group_ids)
+        self.lesson_ids = tuple(lesson_ids)
+        self.room_ids = tuple(room_ids)
+        # Teacher index of every lesson, -1 if the lesson has no teacher
+        self.lesson_teachers = tuple(lesson_teachers)
+        self.teachers = max(self.lesson_teachers, default=-1) + 1
+        # (group index, lesson index) of every unit
+        self.units = tuple(units)
+
+    @classmethod
+    def from_models(cls, curricula, slots_per_day=6):
+        """
+        :param curricula: {Group: {Lesson: hours per week}}
+        :param slots_per_day: max number of lessons in a day
+        """
+        group_index, lesson_index, teacher_index = dict(), dict(), dict()
+        lesson_teachers = []
+        units = []
+        for group, lessons in curricula.items():
+            group_index.setdefault(group.id, len(group_index))
+            for lesson, hours in lessons.items():
+                if lesson.id not in lesson_index:
+                    lesson_index[lesson.id] = len(lesson_index)
+                    teacher_id = lesson.teacher.id
+                    if teacher_id > 0:
+                        teacher_index.setdefault(teacher_id, len(teacher_index))
+                        lesson_teachers.append(teacher_index[teacher_id])
+                    else:
+                        lesson_teachers.append(-1)
+                units.extend([(group_index[group.id], lesson_index[lesson.id])] * hours)
+        room_ids = sorted(i for i in Classroom.objects if i > 0)
+        return cls(
+            slots_per_day,
+            group_index,
+            lesson_index,
+            lesson_teachers,
+            room_ids,
+            units,
+        )
+
+    def unit_teacher(self, unit):
+        return self.lesson_teachers[self.units[unit][1]]
+
+    def count_unplaced(self, assignment):
+        return sum(1 for item in assignment if item is None)
+
+    def get_week_items(self, assignment):
+        """
+        Converts assignment to day items
+        :param assignment: (time, room index) or None for every unit
+        :return: {group id: {day_order: [(lesson_id, classroom_id), ...]}}
+        """
+        grid = dict()
+        for unit, item in enumerate(assignment):
+            if item is None:
+                continue
+            time, room = item
+            group, lesson = self.units[unit]
+            grid[group, time] = (self.lesson_ids[lesson], self.room_ids[room])
+
+        result = dict()
+        for group, group_id in enumerate(self.group_ids):
+            days = result[group_id] = dict()
+            for day in range(DAYS_IN_WEEK):
+                items = [
+                    grid.get((group, day * self.slots_per_day + slot), (-1, -1))
+                    for slot in range(self.slots_per_day)
+                ]
+                # Empty items at the end of the day are not stored
+                while items and items[-1] == (-1, -1):
+                    items.pop()
+                days[day + 1] = items
+        return result
+
+    def write_schedule(self, name, assignment):
+        """
+        Creates a new schedule with name = {name} from the assignment
+        :return: False if a schedule with such name can not be created
+        """
+        if not Schedule.create(name):
+            return False
+        Schedule(name)
+        week_items = self.get_week_items(assignment)
+        with session():
+            days = Day.new_many(
+                dict(
+                    day_order=day_order,
+                    lessons=[lesson_id for lesson_id, _ in items],
+                    classrooms=[room_id for _, room_id in items],
+                    group_obj=Group.objects[group_id],
+                )
+                for group_id, week in week_items.items()
+                for day_order, items in week.items()
+            )
+            weeks = []
+            start = 0
+            for group_id, week in week_items.items():
+                weeks.append(
+                    dict(
+                        days=days[start : start + len(week)],
+                        group_obj=Group.objects[group_id],
+                    )
+                )
+                start += len(week)
+            Week.new_many(weeks)
+        return True
@@ -0,0 +1,206 @@
+"""
+Bulk import of teachers, groups, classrooms and lessons from csv or xlsx files.
+
+The first row is the header with columns "kind" and "name" and optional
+"teacher" and "image". Kind is teacher, group, classroom or lesson,
+teacher is the name of the teacher of a lesson. For example:
+
+    kind,name,teacher
+    teacher,Ivanova
+    lesson,Math,Ivanova
+
+Rows are validated while the file is read. If any row is wrong nothing is
+written, otherwise all models are written in one transaction.
+Rows that repeat existing models or earlier rows are skipped.
+"""
+import csv
+import os
+from collections import namedtuple, Counter
+from zipfile import BadZipFile
+
+import scheduler.config as config
+from scheduler.data.models.core import session
+from scheduler.data.models.structure import Teacher, Group, Classroom, Lesson
+
+KINDS = {"teacher": Teacher, "group": Group, "classroom": Classroom, "lesson": Lesson}
+REQUIRED_COLUMNS = ("kind", "name")
+
+# created and skipped are {kind: count}, errors are "line N: message" strings
+ImportResult = namedtuple("ImportResult", ("created", "skipped", "errors"))
+
+
+class ImportFileError(Exception):
+    pass
+
+
+def _check_header(header):
+    header = [str(column or "").strip().lower() for column in header]
+    missing = [column for column in REQUIRED_COLUMNS if column not in header]
+    if missing:
+        raise ImportFileError(f"no columns: {', '.join(missing)}")
+    return header
+
+
+def read_csv_rows(filename):
+    """
+    :return: iterator over (line number, {column: value})
+    """
+    with open(filename, newline="", encoding="utf-8-sig") as file:
+        reader = csv.reader(file)
+        header = _check_header(next(reader, ()))
+        for row in reader:
+            yield reader.line_num, dict(zip(header, row))
+
+
+def read_xlsx_rows(filename):
+    """
+    Reads the active sheet without loading the whole workbook
+    :return: iterator over (row number, {column: value})
+    """
+    # openpyxl is needed only here, so it is optional
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFileError("openpyxl is required to import xlsx files")
+
+    workbook = load_workbook(filename, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = _check_header(next(rows, ()))
+        for number, row in enumerate(rows, 2):
+            yield number, dict(zip(header, row))
+    finally:
+        workbook.close()
+
+
+def read_rows(filename):
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == ".csv":
+        return read_csv_rows(filename)
+    if extension == ".xlsx":
+        return read_xlsx_rows(filename)
+    raise ImportFileError("the file must have .csv or .xlsx extension")
+
+
+def _get_value(row, column):
+    value = row.get(column)
+    return "" if value is None else str(value).strip()
+
+
+def _get_models(cls):
+    return [obj for obj in cls.objects.values() if isinstance(obj, cls)]
+
+
+def validate_rows(rows):
+    """
+    Checks rows and drops the ones that repeat existing models or earlier rows.
+    Models are not created
+    :param rows: iterator over (line number, {column: value})
+    :return: ({kind: [values of new models]}, {kind: skipped count}, errors)
+    """
+    # Names of existing models, lessons are identified by name and teacher name
+    known = {kind: set() for kind in KINDS}
+    for kind in ("teacher", "group", "classroom"):
+        known[kind].update(obj.name for obj in _get_models(KINDS[kind]))
+    known["lesson"].update((obj.name, obj.teacher.name) for obj in _get_models(Lesson))
+    teacher_counts = Counter(obj.name for obj in _get_models(Teacher))
+
+    new = {kind: [] for kind in KINDS}
+    skipped = Counter()
+    errors = []
+    # Lessons are checked at the end, so teachers could be below them
+    lessons = []
+    for number, row in rows:
+        kind = _get_value(row, "kind").lower()
+        name = _get_value(row, "name")
+        if not kind and not name:
+            continue
+        if kind not in KINDS:
+            errors.append((number, f'unknown kind "{kind}"'))
+            continue
+        if not name:
+            errors.append((number, "empty name"))
+            continue
+        if kind == "lesson":
+            teacher = _get_value(row, "teacher")
+            if not teacher:
+                errors.append((number, "lesson without teacher"))
+            else:
+                lessons.append((number, name, teacher))
+            continue
+        if name in known[kind]:
+            skipped[kind] += 1
+            continue
+        known[kind].add(name)
+        if kind == "teacher":
+            new[kind].append((name, _get_value(row, "image")))
+        else:
+            new[kind].append((name,))
+
+    new_teachers = {name for name, _ in new["teacher"]}
+    for number, name, teacher in lessons:
+        if teacher_counts[teacher] > 1:
+            errors.append((number, f'several teachers are named "{teacher}"'))
+        elif not teacher_counts[teacher] and teacher not in new_teachers:
+            errors.append((number, f'unknown teacher "{teacher}"'))
+        elif (name, teacher) in known["lesson"]:
+            skipped["lesson"] += 1
+        else:
+            known["lesson"].add((name, teacher))
+            new["lesson"].append((name, teacher))
+    errors = [f"line {number}: {error}" for number, error in sorted(errors)]
+    return new, dict(skipped), errors
+
+
+def create_models(new):
+    """
+    Creates models in one transaction
+    :param new: {kind: [values of new models]} from validate_rows
+    :return: {kind: created count}
+    """
+    with session():
+        teachers = {obj.name: obj for obj in _get_models(Teacher)}
+        created = Teacher.new_many(
+            dict(name=name, image=image or config.DEFAULT_TEACHER_IMG)
+            for name, image in new["teacher"]
+        )
+        teachers.update((obj.name, obj) for obj in created)
+        Group.new_many(dict(name=name) for (name,) in new["group"])
+        Classroom.new_many(dict(name=name) for (name,) in new["classroom"])
+        Lesson.new_many(
+            dict(name=name, teacher=teachers[teacher])
+            for name, teacher in new["lesson"]
+        )
+    return {kind: len(values) for kind, values in new.items() if values}
+
+
+def check_structure(filename):
+    """
+    Reads and validates the file, models are not created.
+    It could be run in a worker thread, then create_models must be called
+    in the main one
+    :return: ({kind: [values of new models]}, {kind: skipped count}, errors)
+    :raises: ImportFileError if the file can not be read
+    """
+    try:
+        return validate_rows(read_rows(filename))
+    except (OSError, UnicodeDecodeError, csv.Error, BadZipFile) as err:
+        raise ImportFileError(str(err))
+
+
+def import_structure(filename, dry_run=False):
+    """
+    Imports models from the file into the main db, the structure must be loaded
+    :param dry_run: rows are only checked, nothing is written,
+                    created counts are the models that would be created
+    :return: ImportResult, nothing is written if it has errors
+    :raises: ImportFileError if the file can not be read
+    """
+    new, skipped, errors = check_structure(filename)
+    if errors:
+        return ImportResult(dict(), skipped, errors)
+    if dry_run:
+        created = {kind: len(values) for kind, values in new.items() if values}
+    else:
+        created = create_models(new)
+    return ImportResult(created, skipped, errors)
@@ -1,7 +1,21 @@
+import threading
 from collections import defaultdict
+from contextlib import contextmanager
 
 from .fields import Field, IntegerField
-from ..database_interaction.orm import get, insert, update_by_id, delete_by_id
+from .references import Manager
+from ..database_interaction.db_utils import transaction, db_exists
+from ..database_interaction.orm import (
+    get,
+    get_where,
+    get_max_id,
+    insert,
+    insert_many,
+    update_by_id,
+    update_by_ids,
+    delete_by_id,
+    delete_by_ids,
+)
 
 
 def staticinit(method):
@@ -25,7 +39,146 @@ def staticinit(method):
     return prop
 
 
+class Session:
+    """
+    Unit of work. It collects saved and deleted instances
+    and writes only their changed columns at flush
+    """
+
+    def __init__(self):
+        # Dicts are used as ordered sets
+        self.saved = dict()
+        self.deleted = dict()
+
+    def add(self, model):
+        self.saved[model] = None
+
+    def delete(self, model):
+        self.saved.pop(model, None)
+        if not model.created:
+            self.deleted[model] = None
+
+    def flush(self):
+        # db name -> class -> instances
+        saved = defaultdict(lambda: defaultdict(list))
+        deleted = defaultdict(lambda: defaultdict(list))
+        for model in self.saved:
+            saved[model.db_name][model.__class__].append(model)
+        for model in self.deleted:
+            deleted[model.db_name][model.__class__].append(model.id)
+
+        for db_name in set(saved) | set(deleted):
+            with transaction(db_name):
+                for cls, models in saved[db_name].items():
+                    self._write(db_name, cls, models)
+                for cls, ids in deleted[db_name].items():
+                    delete_by_ids(db_name, cls.get_table_name(), ids)
+                    cls.delete_related(ids)
+
+        for model in self.saved:
+            model.created = False
+            model.clean()
+        self.saved.clear()
+        self.deleted.clear()
+
+    def rollback(self):
+        """
+        Brings queued instances back in line with the db when the block or
+        flush fails. Stored instances get their stored values and deleted ones
+        return to their managers, created ones that were not written are dropped
+        and max_id of their classes is restored
+        """
+        # Class -> the smallest id of its created instances that were not written
+        first_ids = dict()
+        for model in list(self.saved) + list(self.deleted):
+            if model.refresh():
+                model.objects[model.id] = model
+                model.__post_init__()
+                continue
+            if model.created:
+                cls = type(model)
+                first_ids[cls] = min(first_ids.get(cls, model.id), model.id)
+            model.discard()
+        # Ids of the dropped instances are given again
+        for cls, first_id in first_ids.items():
+            cls.max_id.value = min(cls.max_id.value, first_id - 1)
+        self.saved.clear()
+        self.deleted.clear()
+
+    @staticmethod
+    def _write(db_name, cls, models):
+        table = cls.get_table_name()
+        created = [model for model in models if model.created]
+        if created:
+            insert_many(
+                db_name,
+                table,
+                tuple(field.name for field in cls.fields),
+                [model.get_data() for model in created],
+            )
+        updates = defaultdict(list)
+        for model in models:
+            if not model.created:
+                fields = tuple(field.name for field in model.get_dirty_fields())
+                if fields:
+                    updates[fields].append(model)
+        for fields, changed in updates.items():
+            update_by_ids(
+                db_name,
+                table,
+                [model.id for model in changed],
+                fields,
+                [model.get_data(fields) for model in changed],
+            )
+        cls.save_related(models)
+
+
+# Stacks of open sessions by thread, so saves of one thread
+# are never flushed by a session of another one
+_local = threading.local()
+
+
+def _get_sessions():
+    if not hasattr(_local, "sessions"):
+        _local.sessions = []
+    return _local.sessions
+
+
+def current_session():
+    sessions = _get_sessions()
+    return sessions[-1] if sessions else None
+
+
+@contextmanager
+def session():
+    """
+    Instances saved or deleted inside the block are written when it ends,
+    in one transaction per database. Nested blocks join the outer one.
+    If the block or the writing fails, queued instances are rolled back
+    """
+
+    sessions = _get_sessions()
+    if sessions:
+        yield sessions[-1]
+        return
+    current = Session()
+    sessions.append(current)
+    try:
+        try:
+            yield current
+        finally:
+            sessions.pop()
+        # Saves made by save_related while flushing are written at once
+        current.flush()
+    except BaseException:
+        current.rollback()
+        raise
+
+
 class Null:
+    # Null is never deleted, references to it are valid in any generation
+    _checked_generation = None
+
     def __init__(self):
         self.id = -1
 
@@ -36,7 +189,25 @@ class Null:
         return None
 
 
-class DBModel:
+class ModelMeta(type):
+    """
+    Adds slots for the fields declared in the class body,
+    so instances of models keep field values without __dict__
+    """
+
+    def __new__(mcs, name, bases, namespace):
+        namespace["__slots__"] = tuple(namespace.get("__slots__", ())) + tuple(
+            value.slot for value in namespace.values() if isinstance(value, Field)
+        )
+        return super().__new__(mcs, name, bases, namespace)
+
+
+# Dirty fields of a clean instance, it is shared to save memory
+_CLEAN = frozenset()
+
+
+class DBModel(metaclass=ModelMeta):
+    __slots__ = ("created", "_dirty", "_checked_generation")
     null = Null()
 
     id = IntegerField(
@@ -51,16 +222,21 @@ class DBModel:
     def __init__(self, **kwargs):
         # Flag means that the object was created by user and need to be inserted, not updated
         self.created = False
+        # Names of the fields changed since the last save
+        self._dirty = _CLEAN
+        # Generation of the manager in which the instance was found in it
+        self._checked_generation = None
 
         # Initializing object fields
         for field in self.fields:
-            setattr(self, field.name, field.create_holder(kwargs[field.name]))
+            field.set_raw(self, field.to_python(kwargs[field.name]))
         # Initializing objects
         self.objects[self.id] = self
 
         # Checking max_id
-        if self.id > self.max_id:
-            self.max_id = self.id
+        max_id = self.max_id
+        if self.id > max_id.value:
+            max_id.value = self.id
         self.__post_init__()
 
     # It is called after __init__
@@ -76,48 +252,142 @@ class DBModel:
         result.save()
         return result
 
-    # Saves instance into db
+    # Creates many instances of class programmatically.
+    # Ids are given as one block and all instances are inserted at once.
+    # If any of them fails, none are kept and max_id is restored
+    @classmethod
+    def new_many(cls, rows):
+        """
+        :param rows: iterable of dicts with values of fields, as kwargs of new
+        :return: list of created instances in the order of rows
+        """
+        max_id = cls.max_id
+        last_id = max_id.value
+        result = []
+        try:
+            # __init__ advances max_id, so the next row gets the next id
+            for kwargs in rows:
+                model = cls(**dict(kwargs, id=max_id.value + 1))
+                model.created = True
+                result.append(model)
+            cls.save_many(result)
+        except BaseException:
+            for model_id in range(last_id + 1, max_id.value + 1):
+                cls.objects.pop(model_id, None)
+            max_id.value = last_id
+            raise
+        return result
+
+    # Saves instances of class into db with one statement per kind of change.
+    # Inside session() it is postponed till flush
+    @classmethod
+    def save_many(cls, models):
+        current = current_session()
+        if current is not None:
+            for model in models:
+                current.add(model)
+            return
+        if not models:
+            return
+        with transaction(cls.db_name):
+            Session._write(cls.db_name, cls, models)
+        for model in models:
+            model.created = False
+            model.clean()
+
+    # Saves instance into db. Inside session() it is postponed till flush
     def save(self):
-        if self.created:
-            insert(
-                self.db_name,
-                self.get_table_name(),
-                tuple(field.name for field in self.fields),
-                self.get_data(),
-            )
-            self.created = False
-        else:
-            update_by_id(
-                self.db_name,
-                self.get_table_name(),
-                self.id,
-                tuple(field.name for field in self.fields if field.name != "id"),
-                self.get_data_without_id(),
-            )
+        current = current_session()
+        if current is not None:
+            current.add(self)
+            return
+        with transaction(self.db_name):
+            if self.created:
+                insert(
+                    self.db_name,
+                    self.get_table_name(),
+                    tuple(field.name for field in self.fields),
+                    self.get_data(),
+                )
+            else:
+                fields = tuple(field.name for field in self.get_dirty_fields())
+                if fields:
+                    update_by_id(
+                        self.db_name,
+                        self.get_table_name(),
+                        self.id,
+                        fields,
+                        self.get_data(fields),
+                    )
+            self.save_related([self])
+        self.created = False
+        self.clean()
 
     # Deletes instance of class from db and its manager
     def delete(self):
-        delete_by_id(self.db_name, self.get_table_name(), self.id)
-        del self.objects[self.id]
-
-    # Is used when user want to get a field which is wrapped in ObjectHolder
-    # It returns the value of ObjectHolder instead of link to holder
-    def __getattribute__(self, item):
-        field = super().__getattribute__(item)
-        if isinstance(field, Field.ObjectHolder):
-            return field.value
-        return field
-
-    # Is used when user want to set a field which is wrapped in ObjectHolder
-    # It replaces the value of ObjectHolder instead of link to holder
-    def __setattr__(self, key, value):
-        field = None
-        if hasattr(self, key):
-            field = super().__getattribute__(key)
-        if isinstance(field, Field.ObjectHolder):
-            field.value = value
+        current = current_session()
+        if current is not None:
+            current.delete(self)
+        else:
+            delete_by_id(self.db_name, self.get_table_name(), self.id)
+            self.delete_related([self.id])
+        self.discard()
+
+    # Removes instance from its manager and the indexes of its class
+    def discard(self):
+        self.objects.pop(self.id, None)
+
+    # Sets the stored values of the fields to instance.
+    # Returns False if it is not stored
+    def refresh(self):
+        if not db_exists(self.db_name):
+            return False
+        names = [field.name for field in self.fields]
+        rows = get_where(self.db_name, self.get_table_name(), names, "id", self.id)
+        if not rows:
+            return False
+        for field, value in zip(self.fields, rows[0]):
+            field.set_raw(self, field.to_python(value))
+        self.created = False
+        self.clean()
+        return True
+
+    # Writes data of the saved instances that is stored outside of the model table.
+    # It is called before the instances are marked as clean
+    @classmethod
+    def save_related(cls, models):
+        pass
+
+    # Deletes data of the instances that is stored outside of the model table
+    @classmethod
+    def delete_related(cls, ids):
+        pass
+
+    # Marks fields as changed, so they will be written by the next save
+    def mark_dirty(self, *names):
+        if self._dirty:
+            self._dirty.update(names)
         else:
-            super().__setattr__(key, value)
+            self._dirty = set(names)
+
+    def clean(self):
+        self._dirty = _CLEAN
+        # Generation of the manager in which the instance was found in it
+        self._checked_generation = None
+
+    # Checks whether the instance or the named fields changed since the last save
+    def is_dirty(self, *names):
+        if not names:
+            return self.created or bool(self._dirty)
+        return self.created or any(name in self._dirty for name in names)
+
+    # Returns changed fields in the order of cls.fields
+    def get_dirty_fields(self):
+        return [
+            field
+            for field in self.fields
+            if field.name in self._dirty and field.name != "id"
+        ]
 
     @classmethod
     def get_table_name(cls) -> str:
@@ -149,7 +419,7 @@ class DBModel:
     @classmethod
     @staticinit
     def objects(cls):
-        return defaultdict(lambda: Null())
+        return Manager(Null)
 
     @classmethod
     @staticinit
@@ -159,26 +429,40 @@ class DBModel:
     @classmethod
     @staticinit
     def db_name(cls):
-        return Field.ObjectHolder("")
+        return ""
 
     # Loads all instances of cls from db with name db_name
     @classmethod
     def load_objects(cls, db_name):
         cls.db_name = db_name
+        cls.objects.invalidate()
         for vals in get(db_name, cls.get_table_name(), [f.name for f in cls.fields]):
             cls(**{field.name: val for field, val in zip(cls.fields, vals)})
 
-    def get_holder(self, name):
-        return super().__getattribute__(name)
+    # Loads instances of cls with {field} = {value} from db with name db_name
+    @classmethod
+    def load_objects_where(cls, db_name, field, value):
+        cls.db_name = db_name
+        cls.objects.invalidate()
+        names = [f.name for f in cls.fields]
+        return [
+            cls(**dict(zip(names, vals)))
+            for vals in get_where(db_name, cls.get_table_name(), names, field, value)
+        ]
 
-    # Help method for serialization
-    def get_data(self):
-        return [self.get_holder(field.name).to_sql() for field in self.fields]
+    # New ids must not collide with ids of instances that are stored, but not loaded
+    @classmethod
+    def reserve_stored_ids(cls, db_name):
+        stored = get_max_id(db_name, cls.get_table_name())
+        if stored > cls.max_id.value:
+            cls.max_id.value = stored
 
     # Help method for serialization
-    def get_data_without_id(self):
+    def get_data(self, names=None):
+        if names is None:
+            return [field.to_sql(field.get_raw(self)) for field in self.fields]
+        cls = type(self)
         return [
-            self.get_holder(field.name).to_sql()
-            for field in self.fields
-            if field.name != "id"
+            field.to_sql(field.get_raw(self))
+            for field in (getattr(cls, name) for name in names)
         ]
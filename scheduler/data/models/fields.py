@@ -1,30 +1,19 @@
 import json
-import os.path
-import shutil
-import string
-import random
-from typing import Iterable
-
-from PyQt5.QtCore import QRegExp
-from PyQt5.QtWidgets import (
-    QLabel,
-    QLineEdit,
-    QTextEdit,
-    QVBoxLayout,
-    QPushButton,
-    QFileDialog,
-    QTextBrowser,
-)
+from collections.abc import Iterable
 
 import scheduler.config as config
-from scheduler.view.core import PicButton, ImageDialog, ErrorDialog
-from scheduler.view.structure_interaction import (
-    InfoModelDialog,
-    SelectOneItemListDialog,
-)
+from .references import ReferenceList
+
+# Widgets of the fields are made by scheduler.view.field_widgets,
+# so the models do not depend on Qt
 
 
 class Field:
+    """
+    Descriptor of a model column. The value is kept in the slot "_{name}"
+    of the instance, so instances have no __dict__ (see ModelMeta in core)
+    """
+
     def __init__(
         self,
         name,
@@ -36,11 +25,14 @@ class Field:
         russian_name="",
     ):
         self.name = name
+        self.slot = "_" + name
         self.modifiers = []
         self.field_type = field_type
         self.read_only = read_only
         self.russian_name = russian_name
         self.default = default
+        # Member descriptor of the slot, it is set with the owner class
+        self._member = None
         if not russian_name:
             self.russian_name = name
         if primary_key:
@@ -57,34 +49,49 @@ class Field:
             return " ".join([self.name, self.field_type, modifiers])
         return " ".join([self.name, self.field_type])
 
-    # Returns ObjectHolder instance
-    def create_holder(self, *args, **kwargs):
-        kwargs["parent"] = self
-        return self.__class__.ObjectHolder(*args, **kwargs)
+    def __set_name__(self, owner, name):
+        self._member = owner.__dict__[self.slot]
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return self._member.__get__(instance)
+
+    # Changed values are marked dirty, so they will be written by the next save
+    def __set__(self, instance, value):
+        if self.__get__(instance) != value:
+            instance.mark_dirty(self.name)
+        self._member.__set__(instance, value)
 
-    # Returns PyQT5 widgets that describe the field and could be changed
-    def get_widget_for_change(self, context, value):
-        return QLabel(str(value), context), lambda: None
+    # Returns the stored value, references are not checked
+    def get_raw(self, instance):
+        return self._member.__get__(instance)
 
-    # Returns PyQT5 widgets that describe the field
-    def get_widget_for_info(self, context, value):
-        return QLabel(str(value), context)
+    # Stores the value without marking it dirty
+    def set_raw(self, instance, value):
+        self._member.__set__(instance, value)
+
+    # Converts the value from db or from the constructor into the stored value
+    def to_python(self, value):
+        return value
+
+    # Converts the stored value into the value for db
+    def to_sql(self, value):
+        return str(value)
 
     def check_val(self, val):
         return bool(val)
 
-    # Wrapper for values
+    # Mutable box for a value, it is used for class variables and by the view
     class ObjectHolder:
-        def __init__(self, obj, parent=None):
+        __slots__ = ("_value",)
+
+        def __init__(self, obj):
             self._value = obj
-            self._parent = parent
 
         def __getattr__(self, item):
             return getattr(self._value, item)
 
-        def to_sql(self):
-            return str(self._value)
-
         @property
         def value(self):
             return self._value
@@ -101,111 +108,32 @@ class IntegerField(Field):
     def __init__(self, name, **kwargs):
         super().__init__(name, "INTEGER", **kwargs)
 
-    def get_widget_for_change(self, context, value):
-        if not self.read_only:
-            widget = QLineEdit("0" if value is None else str(value), context)
-            widget.setValidator(QRegExp("[0-9]{30}"))
-            return widget, widget.text
-        return super().get_widget_for_change(context, value)
-
     def check_val(self, val):
         return isinstance(val, int)
 
-    class ObjectHolder(Field.ObjectHolder):
-        def __init__(self, val, parent):
-            if not isinstance(val, int):
-                raise TypeError("Value must be int")
-            super().__init__(val, parent)
+    def to_python(self, value):
+        if not isinstance(value, int):
+            raise TypeError("Value must be int")
+        return value
 
-        def to_sql(self):
-            return self._value
+    def to_sql(self, value):
+        return value
 
 
 class StringField(Field):
     def __init__(self, name, **kwargs):
         super().__init__(name, "TEXT", **kwargs)
 
-    def get_widget_for_change(self, context, value):
-        if not self.read_only:
-            edit = QTextEdit("" if value is None else str(value), context)
-            return edit, edit.toPlainText
-        return super().get_widget_for_change(context, value)
-
     def check_val(self, val):
         return isinstance(val, str)
 
-    def get_widget_for_info(self, context, value):
-        textBrowser = QTextBrowser(context)
-        textBrowser.setText(str(value))
-        textBrowser.setFixedWidth(200)
-        textBrowser.adjustSize()
-        return textBrowser
-
-    class ObjectHolder(Field.ObjectHolder):
-        def __init__(self, val, parent):
-            if not isinstance(val, str):
-                raise TypeError(f"Value must be str. Not <{type(val).__name__}>")
-            super().__init__(val, parent)
-
-
-def generate_random_string(n=16):
-    return "".join(random.choices(string.ascii_uppercase + string.digits, k=n))
+    def to_python(self, value):
+        if not isinstance(value, str):
+            raise TypeError(f"Value must be str. Not <{type(value).__name__}>")
+        return value
 
 
 class ImageField(StringField):
-    image_size = 300
-
-    def get_widget_for_change(self, context, value):
-        if not self.read_only:
-            container = QVBoxLayout(context)
-
-            image_name = Field.ObjectHolder(value)
-
-            img = PicButton(
-                context,
-                value or self.default.replace("'", "") or config.DEFAULT_TEACHER_IMG,
-            )
-            img.clicked.connect(lambda: self.show_img(context, image_name.value))
-            img.set_max_dimension(self.image_size)
-
-            load_btn = QPushButton("Загрузить", context)
-            load_btn.clicked.connect(lambda: self.load_img(context, image_name, img))
-
-            container.addWidget(img)
-            container.addWidget(load_btn)
-            return container, lambda: image_name.value
-        return super().get_widget_for_change(context, value)
-
-    def get_widget_for_info(self, context, value):
-        container = QVBoxLayout(context)
-        img = PicButton(context, value)
-        img.clicked.connect(lambda: self.show_img(context, value))
-        img.set_max_dimension(self.image_size)
-        container.addWidget(img)
-        return container
-
-    @staticmethod
-    def load_img(context, holder, img):
-        way = QFileDialog.getOpenFileName(
-            context, "Выбрать файл", "", "Файл (*.jpg);;Файл (*.png);;Файл (*.jpeg)"
-        )[0]
-        if way:
-            name = generate_random_string()
-            while os.path.exists(os.path.join(config.IMAGES_DIR, name)):
-                name = generate_random_string()
-            dest = (
-                os.path.join(config.IMAGES_DIR, name)
-                + "."
-                + os.path.basename(way).split(".")[-1]
-            )
-            shutil.copyfile(way, dest)
-            holder.value = name
-            img.set_image(name)
-
-    @staticmethod
-    def show_img(context, name):
-        ImageDialog.from_image_name(context, name).exec()
-
     def check_val(self, val):
         return isinstance(val, str)
 
@@ -216,125 +144,89 @@ class ForeignField(Field):
         self.manager = foreign_cls.objects
         self.foreign_cls = foreign_cls
 
-    def get_widget_for_change(self, context, value):
-        if not self.read_only:
-            layout = QVBoxLayout(context)
-            label = QLabel(str(value), context)
-            info_btn = QPushButton("Подробнее", context)
-            edit_btn = QPushButton("Изменить", context)
-
-            layout.addWidget(label)
-            layout.addWidget(info_btn)
-            layout.addWidget(edit_btn)
-
-            holder = Field.ObjectHolder(value)
-
-            info_btn.clicked.connect(lambda: self.show_info(context, holder))
-            edit_btn.clicked.connect(lambda: self.edit_model(context, label, holder))
-            return layout, lambda: holder.value
-        return super().get_widget_for_change(context, value)
-
-    def get_widget_for_info(self, context, value):
-        container = QVBoxLayout()
-        more_btn = QPushButton("Подробнее")
-        more_btn.clicked.connect(
-            lambda: self.show_info(context, Field.ObjectHolder(value))
-        )
-
-        container.addWidget(QLabel(str(value), context))
-        container.addWidget(more_btn)
-
-        return container
-
     def check_val(self, val):
         return isinstance(val, self.foreign_cls)
 
-    @staticmethod
-    def show_info(context, holder):
-        if holder.value is None or holder.value.id < 1:
-            ErrorDialog(context, "Значение неопределено").exec()
-        else:
-            InfoModelDialog(context, holder.value).exec()
-
-    def edit_model(self, context, label, holder):
-        dialog = SelectOneItemListDialog(context, self.foreign_cls.objects)
-        dialog.exec()
-        selected = dialog.get_selected()
-        if selected:
-            label.setText(str(selected))
-            holder.value = selected
-
-    class ObjectHolder(Field.ObjectHolder):
-        def __init__(self, foreign_obj, parent):
-            if isinstance(foreign_obj, int):
-                super().__init__(parent.manager[int(foreign_obj)], parent)
-            else:
-                super().__init__(foreign_obj, parent)
-
-        def to_sql(self):
-            return self._value.id
+    # Deleted instances are replaced by the null instance of their manager.
+    # An instance found in the manager is not checked till its generation changes
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        value = self._member.__get__(instance)
+        if value._checked_generation == self.manager.generation:
+            return value
+        return self.resolve(value)
 
-        @property
-        def value(self):
-            if self._value.id in self._value.__class__.objects:
-                return self._value
-            return self._value.__class__.objects[-1]
+    def resolve(self, value):
+        manager = self.manager
+        if value.id < 0 or value.id in manager:
+            value._checked_generation = manager.generation
+            return value
+        return manager[-1]
 
-        @value.setter
-        def value(self, val):
-            self._value = val
+    def to_python(self, value):
+        if isinstance(value, int):
+            return self.manager[value]
+        return value
+
+    def to_sql(self, value):
+        return value.id
 
 
 class ListField(Field):
+    """
+    List of instances of foreign_cls, it is stored as json list of their ids
+    """
+
     def __init__(self, name: str, foreign_cls, list_item_type=Field, **kwargs):
         super().__init__(name, "TEXT", **kwargs)
         self.manager = foreign_cls.objects
         self.foreign_cls = foreign_cls
         self.list_item_type = list_item_type
 
-    def get_widget_for_change(self, context, value):
-        # It`s unused, so I decided to pass it
-        if not self.read_only:
-            ...
-        return super().get_widget_for_change(context, value)
-
-    def get_widget_for_info(self, context, value):
-        return QLabel(value, context)
-
     def check_val(self, val):
         return isinstance(val, Iterable) and all(
             isinstance(i, self.foreign_cls) for i in val
         )
 
-    class ObjectHolder(Field.ObjectHolder):
-        def __init__(self, holders, parent):
-            if not isinstance(holders, Iterable):
-                raise TypeError(f'Value "holders" must be iterable, not {holders}')
-            if isinstance(holders, str):
-                holders = [
-                    parent.list_item_type.ObjectHolder(parent.manager[i], self)
-                    for i in json.loads(holders)
-                ]
-            elif all(isinstance(i, int) for i in holders):
-                holders = [
-                    parent.list_item_type.ObjectHolder(parent.manager[i], self)
-                    for i in holders
-                ]
-
-            elif all(
-                isinstance(i, parent.foreign_cls) or (hasattr(i, "id") and i.id == -1)
-                for i in holders
-            ):
-                holders = [parent.list_item_type.ObjectHolder(i, self) for i in holders]
-            elif any(not isinstance(i, parent.foreign_cls) for i in holders):
-                raise TypeError(
-                    f"Holders are neither list of str, int or {parent.foreign_cls.__name__}"
-                )
-
-            if not any(isinstance(i, Field.ObjectHolder) for i in holders):
-                raise TypeError("ObjectHolder objects are required")
-
-            super().__init__(holders, parent)
-
-        def to_sql(self):
-            return f'"{json.dumps([i.to_sql() for i in self.value])}"'
+    # Deleted instances in the list are replaced by the null instance
+    # when the generation of the manager changes
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        value = self._member.__get__(instance)
+        if value.generation != self.manager.generation:
+            self.resolve(value)
+        return value
+
+    def __set__(self, instance, value):
+        if not isinstance(value, ReferenceList):
+            value = ReferenceList(value)
+        super().__set__(instance, value)
+
+    def resolve(self, items):
+        manager = self.manager
+        for i, item in enumerate(items):
+            if item.id > 0 and item.id not in manager:
+                items[i] = manager[-1]
+        items.generation = manager.generation
+
+    def to_python(self, value):
+        if not isinstance(value, Iterable):
+            raise TypeError(f'Value "holders" must be iterable, not {value}')
+        if isinstance(value, str):
+            value = json.loads(value)
+        value = ReferenceList(value)
+        if all(isinstance(i, int) for i in value):
+            return ReferenceList(self.manager[i] for i in value)
+        if all(
+            isinstance(i, self.foreign_cls) or (hasattr(i, "id") and i.id == -1)
+            for i in value
+        ):
+            return value
+        raise TypeError(
+            f"Items are neither list of str, int or {self.foreign_cls.__name__}"
+        )
+
+    def to_sql(self, value):
+        return json.dumps([i.id for i in value])
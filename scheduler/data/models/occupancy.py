@@ -0,0 +1,186 @@
+from collections import Counter
+
+
+class Occupancy:
+    """
+    Counts days that use a classroom or a lesson in every (day_order, slot),
+    so clashes are found without scanning all days.
+    Items of a day are (classroom_id, lesson_id) pairs, ids < 1 mean "empty".
+    Teachers are counted by the current teachers of the lessons,
+    so when a lesson changes its teacher only its counts are moved.
+
+    Items of stored days could be counted by slots on the first check
+    of the slot instead of putting all days, see count_stored
+    """
+
+    def __init__(self, get_teacher_id):
+        """
+        :param get_teacher_id: function that returns id of the teacher
+                               of the lesson with the id or -1
+        """
+        self.get_teacher_id = get_teacher_id
+        # (day_order, slot, classroom_id) -> number of days
+        self.classrooms = Counter()
+        # (day_order, slot, lesson_id) -> number of days
+        self.lessons = Counter()
+        # (day_order, slot, teacher_id) -> number of days
+        self.teachers = Counter()
+        # lesson id -> id of the teacher whose counts include the lesson
+        self.lesson_teachers = dict()
+        # day id -> (day_order, items)
+        self.days = dict()
+        # Function that returns counts of the items of stored days in a slot
+        self.get_stored = None
+        # (day_order, slot) whose stored items are counted
+        self.stored_slots = set()
+
+    def clear(self):
+        self.classrooms.clear()
+        self.lessons.clear()
+        self.teachers.clear()
+        self.lesson_teachers.clear()
+        self.days.clear()
+        self.get_stored = None
+        self.stored_slots.clear()
+
+    def count_stored(self, get_stored):
+        """
+        Makes items of the stored days be counted by slots
+        when the slot is checked first
+        :param get_stored: function(day_order, slot) that returns
+                           (classroom_id, lesson_id, count) of the items of
+                           the stored days that are not put in the slot
+        """
+        self.get_stored = get_stored
+
+    def _count_stored_slot(self, day_order, slot):
+        if self.get_stored is None or (day_order, slot) in self.stored_slots:
+            return
+        self.stored_slots.add((day_order, slot))
+        for classroom_id, lesson_id, count in self.get_stored(day_order, slot):
+            self._add(day_order, slot, (classroom_id, lesson_id), count)
+
+    def remove_stored(self, items):
+        """
+        Uncounts stored items of days that are going to be put
+        :param items: (day_order, slot, (classroom_id, lesson_id))
+        """
+        for day_order, slot, item in items:
+            if (day_order, slot) in self.stored_slots:
+                self._remove(day_order, slot, item)
+
+    @staticmethod
+    def _decrease(counter, key, count=1):
+        counter[key] -= count
+        if counter[key] <= 0:
+            del counter[key]
+
+    def _get_lesson_teacher(self, lesson_id):
+        teacher_id = self.lesson_teachers.get(lesson_id)
+        if teacher_id is None:
+            teacher_id = self.get_teacher_id(lesson_id)
+            self.lesson_teachers[lesson_id] = teacher_id
+        return teacher_id
+
+    def _add(self, day_order, slot, item, count=1):
+        classroom_id, lesson_id = item
+        if classroom_id > 0:
+            self.classrooms[day_order, slot, classroom_id] += count
+        if lesson_id > 0:
+            self.lessons[day_order, slot, lesson_id] += count
+            teacher_id = self._get_lesson_teacher(lesson_id)
+            if teacher_id > 0:
+                self.teachers[day_order, slot, teacher_id] += count
+
+    def _remove(self, day_order, slot, item, count=1):
+        classroom_id, lesson_id = item
+        if classroom_id > 0:
+            self._decrease(self.classrooms, (day_order, slot, classroom_id), count)
+        if lesson_id > 0:
+            self._decrease(self.lessons, (day_order, slot, lesson_id), count)
+            teacher_id = self._get_lesson_teacher(lesson_id)
+            if teacher_id > 0:
+                self._decrease(self.teachers, (day_order, slot, teacher_id), count)
+
+    def set_lesson_teacher(self, lesson_id, teacher_id):
+        """
+        Moves the counts of the lesson to its new teacher
+        :param teacher_id: -1 if the lesson is deleted
+        """
+        old_id = self.lesson_teachers.get(lesson_id)
+        # Lessons that are not counted get their teachers on the first use
+        if old_id is None or old_id == teacher_id:
+            return
+        self.lesson_teachers[lesson_id] = teacher_id
+        for (day_order, slot, counted_id), count in list(self.lessons.items()):
+            if counted_id != lesson_id:
+                continue
+            if old_id > 0:
+                self._decrease(self.teachers, (day_order, slot, old_id), count)
+            if teacher_id > 0:
+                self.teachers[day_order, slot, teacher_id] += count
+
+    def put_day(self, day_id, day_order, items):
+        """
+        Replaces all items of the day
+        """
+        self.remove_day(day_id)
+        items = list(items)
+        self.days[day_id] = (day_order, items)
+        for slot, item in enumerate(items):
+            self._add(day_order, slot, item)
+
+    def remove_day(self, day_id):
+        if day_id not in self.days:
+            return
+        day_order, items = self.days.pop(day_id)
+        for slot, item in enumerate(items):
+            self._remove(day_order, slot, item)
+
+    def set_item(self, day_id, slot, item):
+        day_order, items = self.days[day_id]
+        self._remove(day_order, slot, items[slot])
+        items[slot] = item
+        self._add(day_order, slot, item)
+
+    def append_item(self, day_id, item):
+        day_order, items = self.days[day_id]
+        items.append(item)
+        self._add(day_order, len(items) - 1, item)
+
+    def remove_item(self, day_id, slot):
+        """
+        Removes item of the day, items after it move one slot up
+        """
+        day_order, items = self.days[day_id]
+        for i in range(slot, len(items)):
+            self._remove(day_order, i, items[i])
+        del items[slot]
+        for i in range(slot, len(items)):
+            self._add(day_order, i, items[i])
+
+    def swap_items(self, day_id, i, j):
+        day_order, items = self.days[day_id]
+        self._remove(day_order, i, items[i])
+        self._remove(day_order, j, items[j])
+        items[i], items[j] = items[j], items[i]
+        self._add(day_order, i, items[i])
+        self._add(day_order, j, items[j])
+
+    def classroom_clash(self, day_order, slot, classroom_id):
+        """
+        Checks whether the classroom is used by more than one day in the slot
+        """
+        if classroom_id <= 0:
+            return False
+        self._count_stored_slot(day_order, slot)
+        return self.classrooms[day_order, slot, classroom_id] > 1
+
+    def teacher_clash(self, day_order, slot, teacher_id):
+        """
+        Checks whether the teacher has more than one lesson in the slot
+        """
+        if teacher_id <= 0:
+            return False
+        self._count_stored_slot(day_order, slot)
+        return self.teachers[day_order, slot, teacher_id] > 1
@@ -0,0 +1,47 @@
+from collections import defaultdict
+
+
+class Manager(defaultdict):
+    """
+    Class manager with instances by id. Its generation changes when instances
+    are deleted or loaded, so references checked in the same generation
+    are not checked again
+    """
+
+    def __init__(self, default_factory):
+        super().__init__(default_factory)
+        self.generation = 0
+
+    def invalidate(self):
+        self.generation += 1
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.generation += 1
+
+    def pop(self, *args):
+        result = super().pop(*args)
+        self.generation += 1
+        return result
+
+    def popitem(self):
+        result = super().popitem()
+        self.generation += 1
+        return result
+
+    def clear(self):
+        super().clear()
+        self.generation += 1
+
+
+class ReferenceList(list):
+    """
+    List of instances of ListField. It keeps the generation of the manager
+    in which its items were checked last time
+    """
+
+    __slots__ = ("generation",)
+
+    def __init__(self, items=()):
+        super().__init__(items)
+        self.generation = -1
@@ -1,14 +1,44 @@
+import json
+from collections import defaultdict, namedtuple
+
 from .structure import Lesson, structure_load, Group, Classroom
-from .core import DBModel
-from scheduler.config import MAIN_DB_NAME
+from .core import DBModel, session, staticinit
+from .occupancy import Occupancy
+from scheduler.config import MAIN_DB_NAME, DAY_SLOT_STORAGE, LAZY_SCHEDULE_LOADING
 from ..database_interaction.db_utils import (
+    create_index,
     get_dbs,
     db_exists,
     create_db_with_models,
     delete_db,
+    rename_db,
+    transaction,
+)
+from ..database_interaction.orm import get
+from ..database_interaction.slots import (
+    create_slot_table,
+    has_slot_table,
+    get_slots,
+    get_group_slots,
+    replace_slots,
+    delete_slots,
+    update_slot_teachers,
+    get_slot_lesson_teachers,
+    get_slot_counts,
+    get_teacher_slots,
+    get_groups_with_teacher,
 )
 from .fields import *
-from pathvalidate import is_valid_filename
+
+# kind is "changed", "inserted", "removed" or "swapped".
+# index is the item of the change, other is the second item of a swap.
+# slots are the slots of the day whose items or clashes could change
+DayChange = namedtuple("DayChange", ("kind", "day", "index", "other", "slots"))
+
+
+def _get_lesson_teacher_id(lesson_id):
+    lesson = Lesson.objects.get(lesson_id)
+    return lesson.teacher.id if isinstance(lesson, Lesson) else -1
 
 
 class Day(DBModel):
@@ -24,25 +54,92 @@ class Day(DBModel):
         5: "Пятница",
         6: "Суббота",
     }
+    # Lessons and classrooms are stored in the slot table instead of json columns.
+    # It is set when the objects are loaded
+    slot_storage = False
+    slot_fields = ("lessons", "classrooms")
+    # Classrooms and lessons of all days of the opened schedule by slots
+    occupancy = Occupancy(_get_lesson_teacher_id)
+    # Callables that get DayChange after every change of day items
+    listeners = []
 
-    def add_empty(self):
-        self.classrooms.append(
-            ForeignField.ObjectHolder(self.objects[-1], self.__class__.classrooms)
-        )
-        self.lessons.append(
-            ForeignField.ObjectHolder(self.objects[-1], self.__class__.lessons)
+    def __post_init__(self):
+        self.update_occupancy()
+
+    @classmethod
+    def subscribe(cls, listener):
+        cls.listeners.append(listener)
+
+    @classmethod
+    def unsubscribe(cls, listener):
+        if listener in cls.listeners:
+            cls.listeners.remove(listener)
+
+    def _notify(self, kind, index, other=None, slots=()):
+        if not Day.listeners:
+            return
+        change = DayChange(kind, self, index, other, tuple(slots))
+        for listener in list(Day.listeners):
+            listener(change)
+
+    # Puts all items of the day into the occupancy index
+    def update_occupancy(self):
+        Day.occupancy.put_day(
+            self.id,
+            self.day_order,
+            [
+                (classroom.id, lesson.id)
+                for lesson, classroom in zip(self.lessons, self.classrooms)
+            ],
         )
 
+    # Returns (classroom_id, lesson_id) of the day item
+    def get_occupancy_item(self, index):
+        return self.classrooms[index].id, self.lessons[index].id
+
+    @staticmethod
+    def _get_teacher_id(lesson):
+        return lesson.teacher.id if lesson.id > 0 else -1
+
+    def add_empty(self):
+        self.classrooms.append(self.objects[-1])
+        self.lessons.append(self.objects[-1])
+        self.mark_dirty("lessons", "classrooms")
+        Day.occupancy.append_item(self.id, (-1, -1))
+        index = len(self.lessons) - 1
+        self._notify("inserted", index, slots=(index,))
+
     def remove_day_item_at(self, index):
+        count = len(self.lessons)
         del self.classrooms[index]
         del self.lessons[index]
+        self.mark_dirty("lessons", "classrooms")
+        Day.occupancy.remove_item(self.id, index)
+        # Items after the removed one move one slot up
+        self._notify("removed", index, slots=range(index, count))
 
     def set_lesson(self, index, lesson):
-        self.lessons[index] = ForeignField.ObjectHolder(lesson, self.__class__.lessons)
+        self.lessons[index] = lesson
+        self.mark_dirty("lessons")
+        Day.occupancy.set_item(self.id, index, self.get_occupancy_item(index))
+        self._notify("changed", index, slots=(index,))
 
     def set_classroom(self, index, classroom):
-        self.classrooms[index] = ForeignField.ObjectHolder(
-            classroom, self.__class__.classrooms
+        self.classrooms[index] = classroom
+        self.mark_dirty("classrooms")
+        Day.occupancy.set_item(self.id, index, self.get_occupancy_item(index))
+        self._notify("changed", index, slots=(index,))
+
+    # Checks whether the classroom of the day item is used by another day in the slot
+    def has_classroom_clash(self, index):
+        return Day.occupancy.classroom_clash(
+            self.day_order, index, self.classrooms[index].id
+        )
+
+    # Checks whether the teacher of the day item has another lesson in the slot
+    def has_teacher_clash(self, index):
+        return Day.occupancy.teacher_clash(
+            self.day_order, index, self._get_teacher_id(self.lessons[index])
         )
 
     def uplift_at(self, i):
@@ -61,8 +158,103 @@ class Day(DBModel):
             self.classrooms[i + d],
         )
         self.lessons[i + d], self.lessons[i] = self.lessons[i], self.lessons[i + d]
+        self.mark_dirty("lessons", "classrooms")
+        Day.occupancy.swap_items(self.id, i, i + d)
+        self._notify("swapped", i, i + d, slots=(i, i + d))
+        return True
+
+    def discard(self):
+        Day.occupancy.remove_day(self.id)
+        super().discard()
+
+    def refresh(self):
+        if not super().refresh():
+            return False
+        if Day.slot_storage:
+            group_id = Day.group_obj.get_raw(self).id
+            Day.load_slots(
+                row
+                for row in get_group_slots(Day.db_name, group_id)
+                if row[0] == self.id
+            )
         return True
 
+    # Returns (day_id, slot, day_order, lesson_id, teacher_id, classroom_id) rows
+    def get_slot_rows(self):
+        rows = []
+        for slot, (lesson, classroom) in enumerate(zip(self.lessons, self.classrooms)):
+            rows.append(
+                (
+                    self.id,
+                    slot,
+                    self.day_order,
+                    lesson.id,
+                    self._get_teacher_id(lesson),
+                    classroom.id,
+                )
+            )
+        return rows
+
+    def get_dirty_fields(self):
+        fields = super().get_dirty_fields()
+        if Day.slot_storage:
+            return [field for field in fields if field.name not in Day.slot_fields]
+        return fields
+
+    def get_data(self, names=None):
+        data = super().get_data(names)
+        if Day.slot_storage:
+            if names is None:
+                names = [field.name for field in self.fields]
+            data = [
+                "[]" if name in Day.slot_fields else value
+                for name, value in zip(names, data)
+            ]
+        return data
+
+    @classmethod
+    def save_related(cls, models):
+        if not cls.slot_storage:
+            return
+        changed = [day for day in models if day.is_dirty(*cls.slot_fields)]
+        if changed:
+            replace_slots(
+                cls.db_name,
+                [day.id for day in changed],
+                [row for day in changed for row in day.get_slot_rows()],
+            )
+
+    @classmethod
+    def delete_related(cls, ids):
+        if cls.slot_storage:
+            delete_slots(cls.db_name, ids)
+
+    @classmethod
+    def load_objects(cls, db_name):
+        cls.slot_storage = has_slot_table(db_name)
+        super().load_objects(db_name)
+        if cls.slot_storage:
+            cls.load_slots(get_slots(db_name))
+
+    # Fills lessons and classrooms of loaded days from rows of the slot table
+    @classmethod
+    def load_slots(cls, slot_rows):
+        day_items = defaultdict(list)
+        for day_id, slot, lesson_id, classroom_id in slot_rows:
+            day_items[day_id].append((lesson_id, classroom_id))
+        for day_id, items in day_items.items():
+            day = cls.objects.get(day_id)
+            if day is None:
+                continue
+            cls.lessons.set_raw(
+                day, cls.lessons.to_python([lesson_id for lesson_id, _ in items])
+            )
+            cls.classrooms.set_raw(
+                day,
+                cls.classrooms.to_python([classroom_id for _, classroom_id in items]),
+            )
+            day.update_occupancy()
+
     def __str__(self):
         return Day.day_names[self.day_order]
 
@@ -74,33 +266,154 @@ class Week(DBModel):
     days = ListField("days", Day, list_item_type=ForeignField)
     group_obj = ForeignField("group_obj", Group)
 
+    # Index of weeks by id of their group
+    @classmethod
+    @staticinit
+    def by_group(cls):
+        return dict()
+
+    def __post_init__(self):
+        self.by_group.setdefault(self.get_group_id(), self)
+
+    # Id is taken from the stored group, so it is known even if the group is deleted
+    def get_group_id(self):
+        return Week.group_obj.get_raw(self).id
+
+    def discard(self):
+        if self.by_group.get(self.get_group_id()) is self:
+            del self.by_group[self.get_group_id()]
+        super().discard()
+
 
 class Schedule:
     is_main_data_loaded = False
+    # Name of the opened schedule
+    name = None
+    # In lazy mode week and days of a group are loaded on the first access
+    lazy = False
+    loaded_groups = set()
 
-    def __init__(self, name):
+    def __init__(self, name, lazy=LAZY_SCHEDULE_LOADING):
         if not Schedule.is_main_data_loaded:
             structure_load()
             Schedule.is_main_data_loaded = True
         if not db_exists(name):
-            create_db_with_models(name, Day, Week)
+            Schedule._create_db(name, DAY_SLOT_STORAGE)
+        Schedule.name = name
+        Schedule.lazy = lazy
+        Schedule.loaded_groups = set()
         Day.objects.clear()
+        Day.occupancy.clear()
         Week.objects.clear()
-        Day.load_objects(name)
-        Week.load_objects(name)
+        Week.by_group.clear()
+        if lazy:
+            Day.db_name = Week.db_name = name
+            Day.slot_storage = has_slot_table(name)
+            Day.reserve_stored_ids(name)
+            Week.reserve_stored_ids(name)
+            create_index(name, Day.get_table_name(), "group_obj")
+            create_index(name, Week.get_table_name(), "group_obj")
+            Schedule._load_occupancy(name)
+        else:
+            Day.load_objects(name)
+            Week.load_objects(name)
+        if Day.slot_storage:
+            # Lessons could change their teachers while another schedule was opened
+            stale = []
+            for lesson_id, stored_id in get_slot_lesson_teachers(name):
+                teacher_id = _get_lesson_teacher_id(lesson_id)
+                if teacher_id != stored_id:
+                    stale.append((teacher_id, lesson_id))
+            if stale:
+                update_slot_teachers(name, stale)
+
+    # Keeps teachers of the day items of the opened schedule in step with lessons
+    @staticmethod
+    def on_lesson_teachers(lesson_teachers):
+        """
+        :param lesson_teachers: (lesson_id, teacher_id) pairs, see Lesson
+        """
+        for lesson_id, teacher_id in lesson_teachers:
+            Day.occupancy.set_lesson_teacher(lesson_id, teacher_id)
+        if Day.slot_storage and Schedule.name and db_exists(Schedule.name):
+            update_slot_teachers(
+                Schedule.name,
+                [(teacher_id, lesson_id) for lesson_id, teacher_id in lesson_teachers],
+            )
+
+    # Fills the occupancy index without creating Day instances.
+    # It is used in lazy mode, so clashes with not loaded groups are found.
+    # With the slot table nothing is read now, items of not loaded groups
+    # are counted by slots when the slots are checked
+    @staticmethod
+    def _load_occupancy(name):
+        if Day.slot_storage:
+            Day.occupancy.count_stored(Schedule._get_stored_counts)
+            return
+        days = get(
+            name, Day.get_table_name(), ("id", "day_order", "lessons", "classrooms")
+        )
+        for day_id, day_order, lessons, classrooms in days:
+            Day.occupancy.put_day(
+                day_id,
+                day_order,
+                list(zip(json.loads(classrooms), json.loads(lessons))),
+            )
+
+    @staticmethod
+    def _get_stored_counts(day_order, slot):
+        return get_slot_counts(Schedule.name, day_order, slot, Schedule.loaded_groups)
+
+    # Loads week and days of the group in lazy mode
+    @staticmethod
+    def load_group(group):
+        if group.id in Schedule.loaded_groups:
+            return
+        Schedule.loaded_groups.add(group.id)
+        days = Day.load_objects_where(Schedule.name, "group_obj", group.id)
+        if Day.slot_storage:
+            slot_rows = get_group_slots(Schedule.name, group.id)
+            # Items of the days could be counted as stored, now they are put by days
+            day_orders = {day.id: day.day_order for day in days}
+            Day.occupancy.remove_stored(
+                (day_orders[day_id], slot, (classroom_id, lesson_id))
+                for day_id, slot, lesson_id, classroom_id in slot_rows
+                if day_id in day_orders
+            )
+            Day.load_slots(slot_rows)
+        Week.load_objects_where(Schedule.name, "group_obj", group.id)
+
+    # Loads weeks of all groups that were not accessed yet in lazy mode
+    @staticmethod
+    def load_all():
+        if not Schedule.lazy:
+            return
+        for group in list(Group.objects.values()):
+            if isinstance(group, Group):
+                Schedule.load_group(group)
+
+    @staticmethod
+    def _create_db(name, slot_storage):
+        create_db_with_models(name, Day, Week)
+        if slot_storage:
+            create_slot_table(name)
 
     @staticmethod
     def get_all_schedules():
         return [i for i in get_dbs() if i != MAIN_DB_NAME]
 
+    # pathvalidate is imported here, it takes longer than the rest of the models
+    @staticmethod
+    def is_valid_name(name):
+        from pathvalidate import is_valid_filename
+
+        return is_valid_filename(name)
+
     @staticmethod
     def rename(old_name, new_name):
-        if db_exists(new_name) or not is_valid_filename(new_name):
+        if db_exists(new_name) or not Schedule.is_valid_name(new_name):
             return False
-        os.rename(
-            os.path.join(config.STORE_DIR, old_name) + ".sqlite",
-            os.path.join(config.STORE_DIR, new_name) + ".sqlite",
-        )
+        rename_db(old_name, new_name)
         return True
 
     @staticmethod
@@ -108,29 +421,119 @@ class Schedule:
         delete_db(name)
 
     @staticmethod
-    def create(name):
-        if not is_valid_filename(name) or db_exists(name):
+    def create(name, slot_storage=DAY_SLOT_STORAGE):
+        if not Schedule.is_valid_name(name) or db_exists(name):
             return False
-        create_db_with_models(name, Day, Week)
+        Schedule._create_db(name, slot_storage)
         return True
 
+    # Moves day items of the loaded schedule into the slot table
     @staticmethod
-    def get_week(group):
-        for week in Week.objects.values():
-            if week.group_obj.id == group.id:
-                return week
-        # Not found a week
-        days = []
-        lessons = [Day.objects[-1]] * 6
-        classrooms = [Day.objects[-1]] * 6
-        for i in range(1, 7):
-            days.append(
-                Day.new(
-                    day_order=i,
-                    lessons=lessons,
-                    group=group,
-                    classrooms=classrooms,
-                    group_obj=group,
+    def convert_to_slot_storage():
+        if Day.slot_storage:
+            return
+        Schedule.load_all()
+        create_slot_table(Day.db_name)
+        Day.slot_storage = True
+        with session():
+            for day in Day.objects.values():
+                if isinstance(day, Day):
+                    day.mark_dirty(*Day.slot_fields)
+                    day.save()
+
+    # Returns (group, day_order, slot, lesson, classroom) of all lessons of the teacher
+    @staticmethod
+    def get_teacher_timetable(teacher):
+        if not Day.slot_storage:
+            Schedule.load_all()
+        if Day.slot_storage:
+            return [
+                (
+                    Group.objects[group_id],
+                    day_order,
+                    slot,
+                    Lesson.objects[lesson_id],
+                    Classroom.objects[classroom_id],
                 )
+                for group_id, day_order, slot, lesson_id, classroom_id in (
+                    get_teacher_slots(Day.db_name, teacher.id)
+                )
+            ]
+        result = []
+        for day in Day.objects.values():
+            if not isinstance(day, Day):
+                continue
+            for (
+                day_id,
+                slot,
+                day_order,
+                lesson_id,
+                teacher_id,
+                classroom_id,
+            ) in day.get_slot_rows():
+                if teacher_id == teacher.id:
+                    result.append(
+                        (
+                            day.group_obj,
+                            day_order,
+                            slot,
+                            Lesson.objects[lesson_id],
+                            Classroom.objects[classroom_id],
+                        )
+                    )
+        return sorted(result, key=lambda item: item[1:3])
+
+    # Returns groups that have a lesson of the teacher in the slot of the day
+    @staticmethod
+    def get_groups_with_teacher(teacher, day_order, slot):
+        if Day.slot_storage:
+            return [
+                Group.objects[group_id]
+                for group_id in get_groups_with_teacher(
+                    Day.db_name, teacher.id, day_order, slot
+                )
+            ]
+        Schedule.load_all()
+        return [
+            day.group_obj
+            for day in Day.objects.values()
+            if isinstance(day, Day)
+            and day.day_order == day_order
+            and slot < len(day.lessons)
+            and day.lessons[slot].id > 0
+            and day.lessons[slot].teacher.id == teacher.id
+        ]
+
+    @staticmethod
+    def get_week(group):
+        return Schedule.get_weeks([group])[0]
+
+    # Returns weeks of the groups. Missing weeks are created together
+    # with empty days in one transaction
+    @staticmethod
+    def get_weeks(groups):
+        if Schedule.lazy:
+            for group in groups:
+                Schedule.load_group(group)
+        # Dict keeps the order of groups and drops repeated ones
+        missing = {group.id: group for group in groups if group.id not in Week.by_group}
+        if missing:
+            Schedule._create_weeks(list(missing.values()))
+        return [Week.by_group[group.id] for group in groups]
+
+    @staticmethod
+    def _create_weeks(groups):
+        empty = [Day.objects[-1]] * 6
+        with transaction(Day.db_name):
+            days = Day.new_many(
+                dict(day_order=i, lessons=empty, classrooms=empty, group_obj=group)
+                for group in groups
+                for i in range(1, 7)
+            )
+            Week.new_many(
+                dict(days=days[i * 6 : i * 6 + 6], group_obj=group)
+                for i, group in enumerate(groups)
             )
-        return Week.new(days=days, group_obj=group)
+
+
+Lesson.teacher_listeners.append(Schedule.on_lesson_teachers)
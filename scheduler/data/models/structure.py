@@ -30,6 +30,28 @@ class Classroom(NamedModel):
 class Lesson(NamedModel):
     _plural_class_name = "Уроки"
     teacher = ForeignField("teacher", Teacher, russian_name="Учитель")
+    # Callables that get (lesson_id, teacher_id) pairs of the lessons
+    # that changed their teachers or were deleted, deleted ones have teacher_id -1
+    teacher_listeners = []
+
+    @classmethod
+    def save_related(cls, models):
+        changed = [
+            (lesson.id, lesson.teacher.id)
+            for lesson in models
+            if not lesson.created and lesson.is_dirty("teacher")
+        ]
+        if changed:
+            cls._notify_teachers(changed)
+
+    @classmethod
+    def delete_related(cls, ids):
+        cls._notify_teachers([(lesson_id, -1) for lesson_id in ids])
+
+    @classmethod
+    def _notify_teachers(cls, lesson_teachers):
+        for listener in list(cls.teacher_listeners):
+            listener(lesson_teachers)
 
     def are_same(self, another):
         return another.name == self.name
@@ -1,10 +1,67 @@
 import os
 import pathlib
-from PIL import Image
-from scheduler.config import IMAGES_DIR, STANDARD_IMAGE_SIZE
+import shutil
 
+from PIL import Image, ImageOps
+from scheduler.config import (
+    IMAGES_DIR,
+    ORIGINAL_IMAGES_DIR,
+    KEEP_ORIGINAL_IMAGES,
+)
 
-def process_image(name: str, result: str):
-    img = Image.open(name)
-    extension = pathlib.Path(name).suffix
-    img.resize(STANDARD_IMAGE_SIZE).save(os.path.join(IMAGES_DIR, result + extension))
+THUMBNAIL_EXTENSION = ".jpg"
+THUMBNAIL_QUALITY = 85
+
+
+# Name of the thumbnail file of the image named name without extension
+def get_thumbnail_name(name: str):
+    return name + THUMBNAIL_EXTENSION
+
+
+# Returns path of the kept original of the thumbnail or None
+def get_original_path(image_name: str):
+    stem = pathlib.Path(image_name).stem
+    if not os.path.isdir(ORIGINAL_IMAGES_DIR):
+        return None
+    for name in os.listdir(ORIGINAL_IMAGES_DIR):
+        if pathlib.Path(name).stem == stem:
+            return os.path.join(ORIGINAL_IMAGES_DIR, name)
+    return None
+
+
+def process_image(name: str, result: str, display_size, keep_original=None):
+    """
+    Makes a jpeg thumbnail of the image of the display size, it keeps the aspect ratio.
+    It could be slow for big photos, so it should be run in a worker thread
+    :param name: path of the original image
+    :param result: name of the thumbnail without extension
+    :param display_size: (width, height) of the image shown in the editor
+    :param keep_original: copy the original to ORIGINAL_IMAGES_DIR,
+                          KEEP_ORIGINAL_IMAGES if None
+    :return: name of the thumbnail in IMAGES_DIR
+    """
+    if keep_original is None:
+        keep_original = KEEP_ORIGINAL_IMAGES
+    with Image.open(name) as img:
+        # Jpeg images are decoded right in a smaller scale
+        img.draft("RGB", display_size)
+        img = ImageOps.exif_transpose(img)
+        if img.mode != "RGB":
+            background = Image.new("RGB", img.size, "white")
+            img = img.convert("RGBA")
+            background.paste(img, mask=img.getchannel("A"))
+            img = background
+        img.thumbnail(display_size, Image.LANCZOS)
+        img.save(
+            os.path.join(IMAGES_DIR, get_thumbnail_name(result)),
+            "JPEG",
+            quality=THUMBNAIL_QUALITY,
+            optimize=True,
+        )
+    if keep_original:
+        os.makedirs(ORIGINAL_IMAGES_DIR, exist_ok=True)
+        shutil.copyfile(
+            name,
+            os.path.join(ORIGINAL_IMAGES_DIR, result + pathlib.Path(name).suffix),
+        )
+    return get_thumbnail_name(result)
@@ -1,4 +1,12 @@
+import random
+import string
+
+
 def make_string_short(string, n):
     if len(string) > n:
         return string[: n - 3] + "..."
     return string[:n]
+
+
+def generate_random_string(n=16):
+    return "".join(random.choices(string.ascii_uppercase + string.digits, k=n))
@@ -1,6 +1,8 @@
 import os.path
+from collections import OrderedDict
 
 from PIL.ImageQt import QImage
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtGui import QPainter, QPixmap
 from PyQt5.QtWidgets import (
     QVBoxLayout,
@@ -11,7 +13,71 @@ from PyQt5.QtWidgets import (
     QBoxLayout,
 )
 
-from scheduler.config import IMAGES_DIR
+from scheduler.config import IMAGES_DIR, PIXMAP_CACHE_BUDGET
+from scheduler.data.database_interaction.db_utils import close_thread_connections
+
+
+class PixmapCache:
+    """
+    Process wide LRU cache of pixmaps by (image name, size).
+    Size None is the image as it is on the disk, other sizes are scaled from it.
+    Pixmaps that were used long ago are dropped when the budget is exceeded
+    """
+
+    def __init__(self, budget):
+        # Max bytes of all cached pixmaps
+        self.budget = budget
+        self.used = 0
+        self.pixmaps = OrderedDict()
+        # Number of images read from the disk, it shows whether the cache works
+        self.disk_reads = 0
+
+    @staticmethod
+    def get_cost(pixmap):
+        return pixmap.width() * pixmap.height() * pixmap.depth() // 8
+
+    def get(self, name, size=None):
+        """
+        :param name: name of the image in IMAGES_DIR
+        :param size: (width, height) or None for the original size
+        """
+        key = name, size
+        pixmap = self.pixmaps.get(key)
+        if pixmap is not None:
+            self.pixmaps.move_to_end(key)
+            return pixmap
+        if size is None:
+            self.disk_reads += 1
+            pixmap = QPixmap.fromImage(QImage(os.path.join(IMAGES_DIR, name)))
+        else:
+            original = self.get(name)
+            if original.isNull() or (original.width(), original.height()) == size:
+                return original
+            pixmap = original.scaled(
+                size[0], size[1], Qt.IgnoreAspectRatio, Qt.SmoothTransformation
+            )
+        self._put(key, pixmap)
+        return pixmap
+
+    def _put(self, key, pixmap):
+        self.pixmaps[key] = pixmap
+        self.used += self.get_cost(pixmap)
+        # The newest pixmap is kept even if it is bigger than the budget
+        while self.used > self.budget and len(self.pixmaps) > 1:
+            _, old = self.pixmaps.popitem(last=False)
+            self.used -= self.get_cost(old)
+
+    # Drops all sizes of the image, it is needed if the file is changed
+    def invalidate(self, name):
+        for key in [key for key in self.pixmaps if key[0] == name]:
+            self.used -= self.get_cost(self.pixmaps.pop(key))
+
+    def clear(self):
+        self.pixmaps.clear()
+        self.used = 0
+
+
+pixmap_cache = PixmapCache(PIXMAP_CACHE_BUDGET)
 
 
 def put_in_layout(item, layout):
@@ -21,6 +87,49 @@ def put_in_layout(item, layout):
         layout.addWidget(item)
 
 
+class Worker(QThread):
+    """
+    Runs func(*args) in a thread. The result or the error message comes
+    with a signal, so slots are called in the main thread
+    """
+
+    done = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    # (done, total) of the work
+    progress = pyqtSignal(int, int)
+    # Workers are kept here until they finish, so they are not collected
+    running = set()
+
+    def __init__(self, func, *args, with_progress=False):
+        """
+        :param with_progress: func gets progress=function(done, total)
+                              that emits the progress signal
+        """
+        super().__init__()
+        self.func = func
+        self.args = args
+        self.with_progress = with_progress
+        self.finished.connect(lambda: Worker.running.discard(self))
+
+    def start(self):
+        Worker.running.add(self)
+        super().start()
+
+    def run(self):
+        try:
+            if self.with_progress:
+                result = self.func(*self.args, progress=self.progress.emit)
+            else:
+                result = self.func(*self.args)
+        except Exception as err:
+            self.failed.emit(str(err))
+        else:
+            self.done.emit(result)
+        finally:
+            # Connections opened by func must not outlive the thread
+            close_thread_connections()
+
+
 class ImageDialog(QDialog):
     def __init__(self, parent, pixmap):
         super().__init__(parent)
@@ -37,8 +146,7 @@ class ImageDialog(QDialog):
 
     @staticmethod
     def from_image_name(parent, name):
-        image = QImage(os.path.join(IMAGES_DIR, name))
-        return ImageDialog(parent, QPixmap.fromImage(image))
+        return ImageDialog(parent, pixmap_cache.get(name))
 
 
 class PicButton(QAbstractButton):
@@ -55,7 +163,11 @@ class PicButton(QAbstractButton):
         r.setY(0)
         r.setWidth(self.width())
         r.setHeight(self.height())
-        painter.drawPixmap(r, self.pixmap)
+        # Pixmap of the button size is taken from the cache, so it is not scaled
+        # on every paint
+        painter.drawPixmap(
+            r, pixmap_cache.get(self.image_name, (self.width(), self.height()))
+        )
 
     def set_max_dimension(self, value):
         w, h = self.pixmap.width(), self.pixmap.height()
@@ -68,8 +180,8 @@ class PicButton(QAbstractButton):
         return self.pixmap.size()
 
     def set_image(self, image_name):
-        image = QImage(os.path.join(IMAGES_DIR, image_name))
-        self.pixmap = QPixmap.fromImage(image)
+        self.image_name = image_name
+        self.pixmap = pixmap_cache.get(image_name)
         self.repaint()
 
 
@@ -114,6 +226,12 @@ class ErrorDialog(MessageDialog):
         return self.buttonBox
 
 
+class InfoDialog(ErrorDialog):
+    def __init__(self, parent, text):
+        super().__init__(parent, text)
+        self.setWindowTitle("Сообщение")
+
+
 class ConfirmDialog(MessageDialog):
     def __init__(self, parent):
         super().__init__(parent)
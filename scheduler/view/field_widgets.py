@@ -0,0 +1,236 @@
+import os.path
+
+from PyQt5 import sip
+from PyQt5.QtCore import QRegExp
+from PyQt5.QtGui import QPixmap
+from PyQt5.QtWidgets import (
+    QLabel,
+    QLineEdit,
+    QTextEdit,
+    QVBoxLayout,
+    QPushButton,
+    QFileDialog,
+    QTextBrowser,
+)
+
+import scheduler.config as config
+from scheduler.data.models.fields import (
+    Field,
+    IntegerField,
+    StringField,
+    ImageField,
+    ForeignField,
+    ListField,
+)
+from scheduler.util import generate_random_string
+from .core import PicButton, ImageDialog, ErrorDialog, Worker, pixmap_cache
+
+# Field class -> FieldWidgets instance
+_registry = dict()
+
+
+def register(field_cls):
+    """
+    Class decorator that makes the FieldWidgets subclass
+    the widget factory of the field class and its subclasses
+    """
+
+    def decorator(cls):
+        _registry[field_cls] = cls()
+        return cls
+
+    return decorator
+
+
+def get_field_widgets(field):
+    for cls in type(field).__mro__:
+        if cls in _registry:
+            return _registry[cls]
+    raise KeyError(f"No widgets for {type(field).__name__}")
+
+
+# Returns PyQT5 widgets that describe the field and could be changed
+# and the function that returns the new value
+def get_widget_for_change(field, context, value):
+    return get_field_widgets(field).get_widget_for_change(field, context, value)
+
+
+# Returns PyQT5 widgets that describe the field
+def get_widget_for_info(field, context, value):
+    return get_field_widgets(field).get_widget_for_info(field, context, value)
+
+
+@register(Field)
+class FieldWidgets:
+    def get_widget_for_change(self, field, context, value):
+        return QLabel(str(value), context), lambda: None
+
+    def get_widget_for_info(self, field, context, value):
+        return QLabel(str(value), context)
+
+
+@register(IntegerField)
+class IntegerFieldWidgets(FieldWidgets):
+    def get_widget_for_change(self, field, context, value):
+        if not field.read_only:
+            widget = QLineEdit("0" if value is None else str(value), context)
+            widget.setValidator(QRegExp("[0-9]{30}"))
+            return widget, widget.text
+        return super().get_widget_for_change(field, context, value)
+
+
+@register(StringField)
+class StringFieldWidgets(FieldWidgets):
+    def get_widget_for_change(self, field, context, value):
+        if not field.read_only:
+            edit = QTextEdit("" if value is None else str(value), context)
+            return edit, edit.toPlainText
+        return super().get_widget_for_change(field, context, value)
+
+    def get_widget_for_info(self, field, context, value):
+        textBrowser = QTextBrowser(context)
+        textBrowser.setText(str(value))
+        textBrowser.setFixedWidth(200)
+        textBrowser.adjustSize()
+        return textBrowser
+
+
+@register(ImageField)
+class ImageFieldWidgets(StringFieldWidgets):
+    image_size = 300
+
+    def get_widget_for_change(self, field, context, value):
+        if not field.read_only:
+            container = QVBoxLayout(context)
+
+            image_name = Field.ObjectHolder(value)
+
+            img = PicButton(
+                context,
+                value or field.default.replace("'", "") or config.DEFAULT_TEACHER_IMG,
+            )
+            img.clicked.connect(lambda: self.show_img(context, image_name.value))
+            img.set_max_dimension(self.image_size)
+
+            load_btn = QPushButton("Загрузить", context)
+            load_btn.clicked.connect(lambda: self.load_img(context, image_name, img))
+
+            container.addWidget(img)
+            container.addWidget(load_btn)
+            return container, lambda: image_name.value
+        return super().get_widget_for_change(field, context, value)
+
+    def get_widget_for_info(self, field, context, value):
+        container = QVBoxLayout(context)
+        img = PicButton(context, value)
+        img.clicked.connect(lambda: self.show_img(context, value))
+        img.set_max_dimension(self.image_size)
+        container.addWidget(img)
+        return container
+
+    def load_img(self, context, holder, img):
+        # Pillow is needed only here
+        from scheduler.data.process_image import process_image, get_thumbnail_name
+
+        way = QFileDialog.getOpenFileName(
+            context, "Выбрать файл", "", "Файл (*.jpg);;Файл (*.png);;Файл (*.jpeg)"
+        )[0]
+        if way:
+            name = generate_random_string()
+            while os.path.exists(
+                os.path.join(config.IMAGES_DIR, get_thumbnail_name(name))
+            ):
+                name = generate_random_string()
+            # Big photos are resized in a thread, the old image is shown until then
+            worker = Worker(
+                process_image, way, name, (self.image_size, self.image_size)
+            )
+            worker.done.connect(lambda result: self.set_img(holder, img, result))
+            worker.failed.connect(lambda err: self.show_load_error(context))
+            worker.start()
+
+    # The worker could finish after the dialog is closed, then its widgets are deleted
+    @staticmethod
+    def set_img(holder, img, name):
+        pixmap_cache.invalidate(name)
+        holder.value = name
+        if not sip.isdeleted(img):
+            img.set_image(name)
+
+    @staticmethod
+    def show_load_error(context):
+        if not sip.isdeleted(context):
+            ErrorDialog(context, "Не удалось загрузить файл").exec()
+
+    # Shows the original image if it is kept, otherwise the thumbnail
+    @staticmethod
+    def show_img(context, name):
+        from scheduler.data.process_image import get_original_path
+
+        original = get_original_path(name)
+        if original:
+            ImageDialog(context, QPixmap(original)).exec()
+        else:
+            ImageDialog.from_image_name(context, name).exec()
+
+
+@register(ForeignField)
+class ForeignFieldWidgets(FieldWidgets):
+    def get_widget_for_change(self, field, context, value):
+        if not field.read_only:
+            layout = QVBoxLayout(context)
+            label = QLabel(str(value), context)
+            info_btn = QPushButton("Подробнее", context)
+            edit_btn = QPushButton("Изменить", context)
+
+            layout.addWidget(label)
+            layout.addWidget(info_btn)
+            layout.addWidget(edit_btn)
+
+            holder = Field.ObjectHolder(value)
+
+            info_btn.clicked.connect(lambda: self.show_info(context, holder))
+            edit_btn.clicked.connect(
+                lambda: self.edit_model(field, context, label, holder)
+            )
+            return layout, lambda: holder.value
+        return super().get_widget_for_change(field, context, value)
+
+    def get_widget_for_info(self, field, context, value):
+        container = QVBoxLayout()
+        more_btn = QPushButton("Подробнее")
+        more_btn.clicked.connect(
+            lambda: self.show_info(context, Field.ObjectHolder(value))
+        )
+
+        container.addWidget(QLabel(str(value), context))
+        container.addWidget(more_btn)
+
+        return container
+
+    @staticmethod
+    def show_info(context, holder):
+        # structure_interaction imports this module
+        from .structure_interaction import InfoModelDialog
+
+        if holder.value is None or holder.value.id < 1:
+            ErrorDialog(context, "Значение неопределено").exec()
+        else:
+            InfoModelDialog(context, holder.value).exec()
+
+    @staticmethod
+    def edit_model(field, context, label, holder):
+        from .structure_interaction import SelectOneItemListDialog
+
+        dialog = SelectOneItemListDialog(context, field.foreign_cls.objects)
+        dialog.exec()
+        selected = dialog.get_selected()
+        if selected:
+            label.setText(str(selected))
+            holder.value = selected
+
+
+@register(ListField)
+class ListFieldWidgets(FieldWidgets):
+    def get_widget_for_info(self, field, context, value):
+        return QLabel(str(value), context)
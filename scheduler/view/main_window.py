@@ -1,8 +1,10 @@
 from PyQt5.QtWidgets import QWidget
 
+from scheduler.config import TABLE_SCHEDULE_EDITOR
 from scheduler.data.models.structure import Lesson, Group, Classroom, Teacher
 from .structure_interaction import EditListDialog
 from .schedule_interaction import ScheduleEditDialog
+from .schedule_table import ScheduleTableDialog
 from .skeletons.main_window import Ui_Form as MainSkeleton
 
 
@@ -18,4 +20,7 @@ class MainWindow(MainSkeleton, QWidget):
         EditListDialog(self, (Lesson, Group, Classroom, Teacher)).exec()
 
     def make_schedule(self):
-        ScheduleEditDialog(self).exec()
+        if TABLE_SCHEDULE_EDITOR:
+            ScheduleTableDialog(self).exec()
+        else:
+            ScheduleEditDialog(self).exec()
@@ -5,78 +5,27 @@ from PyQt5.QtWidgets import (
     QHBoxLayout,
     QWidget,
     QPushButton,
-    QButtonGroup,
-    QRadioButton,
     QInputDialog,
     QFileDialog,
+    QProgressDialog,
 )
-import xlsxwriter
 import scheduler.config as config
+from scheduler.data.database_interaction.instrumentation import action
+from scheduler.data.export import export_schedule
 from scheduler.data.models.schedule import Schedule, Day
 from scheduler.data.models.structure import Group, Lesson, Classroom
-from scheduler.util import make_string_short
 from .core import *
 from .skeletons.schedule_window import Ui_Dialog
 from .structure_interaction import ItemListDialog, SelectOneItemListDialog
 
 
-class ScheduleHolder(QWidget):
-    def __init__(self, parent, name, button_group):
-        super().__init__(parent)
-        self.name = name
-
-        layout = QHBoxLayout()
-        self.name_label = QLabel(make_string_short(name, 30))
-        rename_btn = PicButton(self, config.EDIT_IMG)
-        delete_btn = PicButton(self, config.DELETE_IMG)
-        self.radio_btn = QRadioButton()
-
-        button_group.addButton(self.radio_btn)
-
-        self.name_label.setFixedWidth(80)
-
-        layout.addWidget(self.name_label)
-        layout.addWidget(rename_btn)
-        layout.addWidget(delete_btn)
-        layout.addWidget(self.radio_btn)
-
-        rename_btn.clicked.connect(self.rename)
-        delete_btn.clicked.connect(self.delete)
-
-        self.setLayout(layout)
-
-    def rename(self):
-        text, ok = QInputDialog.getMultiLineText(
-            self, "Изменить название", "Введите название:", text=self.name
-        )
-        if ok:
-            text = text.strip()
-            res = Schedule.rename(self.name, text)
-            if not res:
-                ErrorDialog(self, "Переименование невозможно").exec()
-            else:
-                self.name = text
-                self.name_label.setText(text)
-
-    def delete(self):
-        dialog = ConfirmDialog(self)
-        dialog.exec()
-        if dialog.confirmed:
-            Schedule.delete(self.name)
-            self.setParent(None)
-
-    def is_chosen(self):
-        return self.radio_btn.isChecked()
-
-
 class ScheduleSelectDialog(ItemListDialog):
+    check_mode = "one"
+
     def __init__(self, parent):
         super().__init__(parent, Schedule.get_all_schedules(), "Расписания")
         self.setWindowTitle("Выбрать расписание")
 
-        self.buttonGroup = QButtonGroup()
-        self.holders = dict()
-
         self.result = None
 
     def get_header_widgets(self):
@@ -84,16 +33,19 @@ class ScheduleSelectDialog(ItemListDialog):
         self.create_btn.clicked.connect(self.create_schedule)
         return [self.create_btn]
 
+    def get_action_widgets(self):
+        rename_btn = PicButton(self, config.EDIT_IMG)
+        delete_btn = PicButton(self, config.DELETE_IMG)
+        rename_btn.clicked.connect(self.rename)
+        delete_btn.clicked.connect(self.delete)
+        return [rename_btn, delete_btn]
+
     def get_button_box(self):
         QBtn = QDialogButtonBox.Ok
         buttonBox = QDialogButtonBox(QBtn)
         buttonBox.accepted.connect(self.accept)
         return buttonBox
 
-    def get_row(self, obj):
-        self.holders[obj] = ScheduleHolder(self, obj, self.buttonGroup)
-        return self.holders[obj]
-
     def create_schedule(self):
         name, ok = QInputDialog.getMultiLineText(
             self, "Добавить расписание", "Введите название:"
@@ -101,25 +53,53 @@ class ScheduleSelectDialog(ItemListDialog):
         if ok:
             name = name.strip()
             if Schedule.create(name):
-                self.objects = Schedule.get_all_schedules()
-                self.update_objects()
+                self.list_model.insert_object(name)
             else:
                 ErrorDialog(
                     self, "Не удалось создать расписание с таким названием"
                 ).exec()
 
+    def rename(self):
+        name = self.get_current()
+        if name is None:
+            return
+        text, ok = QInputDialog.getMultiLineText(
+            self, "Изменить название", "Введите название:", text=name
+        )
+        if ok:
+            text = text.strip()
+            if not Schedule.rename(name, text):
+                ErrorDialog(self, "Переименование невозможно").exec()
+            else:
+                self.list_model.update_object(name, text)
+
+    def delete(self):
+        name = self.get_current()
+        if name is None:
+            return
+        dialog = ConfirmDialog(self)
+        dialog.exec()
+        if dialog.confirmed:
+            Schedule.delete(name)
+            self.list_model.remove_object(name)
+
     def accept(self):
         super().accept()
-        for holder in self.holders.values():
-            if holder.is_chosen():
-                self.result = holder.name
-                break
+        checked = self.list_model.get_checked()
+        if checked:
+            self.result = checked[0]
 
     def get_result(self):
         return self.result
 
 
 class DayEventHolder(QWidget):
+    clash_style = """
+            background: red;
+            padding: 2px;
+            color: white;
+            """
+
     def __init__(self, parent, lesson, classroom, update_parent, index, day):
         super().__init__(parent)
         self.lesson = lesson
@@ -142,6 +122,7 @@ class DayEventHolder(QWidget):
         downlift_btn.clicked.connect(self.downlift)
         delete_btn.clicked.connect(self.delete_lesson)
 
+        self.index_label = QLabel(str(self.index + 1))
         self.lesson_label = QLabel(str(lesson))
         self.lesson_label.setFixedHeight(uplift_btn.height())
         self.lesson_label.setAlignment(Qt.AlignCenter)
@@ -151,7 +132,7 @@ class DayEventHolder(QWidget):
 
         self.check_if_overlap()
 
-        layout.addWidget(QLabel(str(self.index + 1)))
+        layout.addWidget(self.index_label)
         layout.addWidget(self.lesson_label)
         layout.addWidget(change_lesson_btn)
         layout.addWidget(self.classroom_label)
@@ -162,6 +143,16 @@ class DayEventHolder(QWidget):
 
         self.setLayout(layout)
 
+    # Shows the day item at the index, it is called when the item changes or moves
+    def set_index(self, index):
+        self.index = index
+        self.lesson = self.day.lessons[index]
+        self.classroom = self.day.classrooms[index]
+        self.index_label.setText(str(index + 1))
+        self.lesson_label.setText(str(self.lesson))
+        self.classroom_label.setText(str(self.classroom))
+        self.check_if_overlap()
+
     def change_classroom(self):
         dialog = SelectOneItemListDialog(self, Classroom.objects)
         dialog.exec()
@@ -198,29 +189,14 @@ class DayEventHolder(QWidget):
             self.update_parent()
 
     def check_if_overlap(self):
-        style = """
-            background: red;
-            padding: 2px;
-            color: white;
-            """
-        if self.classroom.id > -1 and any(
-            i.classrooms[self.index].id == self.classroom.id
-            for i in Day.objects.values()
-            if isinstance(i, Day)
-            and i.classrooms[self.index].id > -1
-            and i.id != self.day.id
-            and i.day_order == self.day.day_order
-        ):
-            self.classroom_label.setStyleSheet(style)
-        if self.lesson.id > -1 and any(
-            i.lessons[self.index].teacher.id == self.lesson.teacher.id
-            for i in Day.objects.values()
-            if isinstance(i, Day)
-            and i.lessons[self.index].id > -1
-            and i.id != self.day.id
-            and i.day_order == self.day.day_order
-        ):
-            self.lesson_label.setStyleSheet(style)
+        if self.day.has_classroom_clash(self.index):
+            self.classroom_label.setStyleSheet(self.clash_style)
+        else:
+            self.classroom_label.setStyleSheet("")
+        if self.day.has_teacher_clash(self.index):
+            self.lesson_label.setStyleSheet(self.clash_style)
+        else:
+            self.lesson_label.setStyleSheet("")
 
 
 class DayHolder(QWidget):
@@ -229,6 +205,7 @@ class DayHolder(QWidget):
         self.parent_dialog = parent
         self.day = day
         self.add_lesson_btn = QPushButton("Добавить урок")
+        self.rows = []
 
         layout = QVBoxLayout()
         self.lessons_layout = QVBoxLayout()
@@ -246,22 +223,50 @@ class DayHolder(QWidget):
     def update_day_items(self):
         day_items = zip(self.day.lessons, self.day.classrooms)
 
-        for i in reversed(range(self.lessons_layout.count())):
-            self.lessons_layout.itemAt(i).widget().setParent(None)
+        for row in self.rows:
+            row.setParent(None)
+        self.rows.clear()
 
         for i, (lesson, classroom) in enumerate(day_items):
-            self.lessons_layout.addWidget(
-                DayEventHolder(self, lesson, classroom, self.repaint_all, i, self.day)
+            self.rows.append(
+                DayEventHolder(self, lesson, classroom, self.save_day, i, self.day)
             )
-        self.parent_dialog.update_layout()
-
-    def repaint_all(self):
-        self.day.save()
-        self.parent_dialog.update_content()
+            self.lessons_layout.addWidget(self.rows[-1])
+
+    # Updates only rows that are touched by the change of the day
+    def apply_change(self, change):
+        if change.kind == "changed":
+            self.rows[change.index].set_index(change.index)
+        elif change.kind == "swapped":
+            self.rows[change.index].set_index(change.index)
+            self.rows[change.other].set_index(change.other)
+        elif change.kind == "inserted":
+            row = DayEventHolder(
+                self,
+                self.day.lessons[change.index],
+                self.day.classrooms[change.index],
+                self.save_day,
+                change.index,
+                self.day,
+            )
+            self.rows.insert(change.index, row)
+            self.lessons_layout.insertWidget(change.index, row)
+            for i in range(change.index + 1, len(self.rows)):
+                self.rows[i].set_index(i)
+            self.parent_dialog.update_layout()
+        elif change.kind == "removed":
+            self.rows.pop(change.index).setParent(None)
+            for i in range(change.index, len(self.rows)):
+                self.rows[i].set_index(i)
+            self.parent_dialog.update_layout()
+
+    def save_day(self):
+        with action("save day"):
+            self.day.save()
 
     def add_day_item(self):
         self.day.add_empty()
-        self.repaint_all()
+        self.save_day()
 
 
 class ScheduleEditDialog(Ui_Dialog, QDialog):
@@ -277,6 +282,7 @@ class ScheduleEditDialog(Ui_Dialog, QDialog):
         self.selected_schedule = None
         self.selected_group = None
         self.day_holders = []
+        Day.subscribe(self.on_day_change)
 
         for group in Group.objects.values():
             self.groupSelect.addItem(str(group), group)
@@ -312,7 +318,9 @@ class ScheduleEditDialog(Ui_Dialog, QDialog):
             self.scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
             self.scroll.setFixedHeight(470)
 
-            for day in Schedule.get_week(group).days:
+            with action("show week"):
+                week = Schedule.get_week(group)
+            for day in week.days:
                 day_holder = DayHolder(self, day)
                 self.day_holders.append(day_holder)
                 self.widget_container.addWidget(day_holder)
@@ -323,53 +331,56 @@ class ScheduleEditDialog(Ui_Dialog, QDialog):
             self.scheduleSpace.repaint()
 
     def update_layout(self):
-        self.scroll.setParent(None)
-        self.scroll_layout.addWidget(self.scroll)
+        self.scroll.widget().adjustSize()
+
+    # Refreshes rows of the changed day, the rest of the week is not repainted.
+    # Only days of the shown group change here and they never clash with each other
+    def on_day_change(self, change):
+        for day_holder in self.day_holders:
+            if day_holder.day.id == change.day.id:
+                day_holder.apply_change(change)
+
+    def done(self, result):
+        Day.unsubscribe(self.on_day_change)
+        super().done(result)
 
     def select_schedule(self):
         dialog = ScheduleSelectDialog(self)
         dialog.exec()
         if dialog.get_result():
             self.selected_schedule = dialog.get_result()
-            Schedule(self.selected_schedule)
+            with action("open schedule"):
+                Schedule(self.selected_schedule)
             self.currentScheduleLabel.setText(self.selected_schedule)
             self.update_content()
 
     def export(self):
+        if not self.selected_schedule:
+            ErrorDialog(self, "Расписание не выбрано").exec()
+            return
         filename = QFileDialog.getSaveFileName(
             self, "Save excel file", "", "Audio Files (*.xlsx)"
         )[0]
         if filename.endswith(".xlsx"):
-            with xlsxwriter.Workbook(filename) as workbook:
-                try:
-                    worksheet = workbook.add_worksheet()
-
-                    for i, group in enumerate(Group.objects.values()):
-                        week = Schedule.get_week(group)
-                        left_col = i * 5
-                        worksheet.merge_range(0, left_col, 0, left_col + 3, str(group))
-                        cursor = 2
-                        for day in week.days:
-                            worksheet.merge_range(
-                                cursor, left_col, cursor, left_col + 3, str(day)
-                            )
-                            cursor += 1
-                            for j, (lesson, classroom) in enumerate(
-                                zip(day.lessons, day.classrooms)
-                            ):
-                                worksheet.write(cursor, left_col, j + 1)
-                                worksheet.merge_range(
-                                    cursor,
-                                    left_col + 1,
-                                    cursor,
-                                    left_col + 2,
-                                    str(lesson),
-                                )
-                                worksheet.write(cursor, left_col + 3, str(classroom))
-                                cursor += 1
-                            cursor += 1
-                    workbook.close()
-                except Exception as err:
-                    print(err)
+            # The workbook is written in a thread, the dialog only shows progress
+            progress = QProgressDialog("Экспорт...", None, 0, 0, self)
+            progress.setWindowTitle("Экспорт")
+            progress.show()
+
+            def update_progress(done, total):
+                progress.setMaximum(total)
+                progress.setValue(done)
+
+            def show_error(err):
+                progress.close()
+                ErrorDialog(self, f"Не удалось экспортировать: {err}").exec()
+
+            worker = Worker(
+                export_schedule, self.selected_schedule, filename, with_progress=True
+            )
+            worker.progress.connect(update_progress)
+            worker.done.connect(lambda _: progress.close())
+            worker.failed.connect(show_error)
+            worker.start()
         elif filename:
             ErrorDialog(self, "Недопустимый формат").exec()
@@ -0,0 +1,248 @@
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt5.QtGui import QBrush, QColor
+from PyQt5.QtWidgets import (
+    QHBoxLayout,
+    QPushButton,
+    QTableView,
+    QStyledItemDelegate,
+    QComboBox,
+    QHeaderView,
+)
+
+from scheduler.data.database_interaction.instrumentation import action
+from scheduler.data.models.schedule import Schedule, Day
+from scheduler.data.models.structure import Lesson, Classroom
+from .core import *
+from .schedule_interaction import ScheduleEditDialog
+
+
+class WeekTableModel(QAbstractTableModel):
+    """
+    Table of a week: a row is a slot, every day has a lesson column
+    and a classroom column. The last row is empty and adds an item to the day.
+    Cells are read from the days on paint, so only visible cells cost anything
+    """
+
+    clash_brush = QBrush(QColor("red"))
+    column_names = ("Урок", "Кабинет")
+
+    def __init__(self, week=None, parent=None):
+        super().__init__(parent)
+        self.days = []
+        self.rows = 0
+        if week is not None:
+            self.set_week(week)
+        Day.subscribe(self.on_day_change)
+
+    def set_week(self, week):
+        self.beginResetModel()
+        self.days = sorted(week.days, key=lambda day: day.day_order)
+        self.rows = self.count_rows()
+        self.endResetModel()
+
+    def count_rows(self):
+        return max((len(day.lessons) for day in self.days), default=0) + 1
+
+    # Returns (day, is classroom column) of the column
+    def get_column(self, column):
+        return self.days[column // 2], column % 2 == 1
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.rows
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.days) * 2
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Vertical:
+            return str(section + 1)
+        day, is_classroom = self.get_column(section)
+        return f"{day}\n{self.column_names[is_classroom]}"
+
+    def flags(self, index):
+        day, _ = self.get_column(index.column())
+        if index.row() > len(day.lessons):
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsEditable
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        day, is_classroom = self.get_column(index.column())
+        slot = index.row()
+        if slot >= len(day.lessons):
+            return None
+        if role in (Qt.DisplayRole, Qt.ToolTipRole):
+            items = day.classrooms if is_classroom else day.lessons
+            return str(items[slot])
+        if role == Qt.EditRole:
+            items = day.classrooms if is_classroom else day.lessons
+            return items[slot].id
+        if role == Qt.BackgroundRole:
+            if is_classroom:
+                clash = day.has_classroom_clash(slot)
+            else:
+                clash = day.has_teacher_clash(slot)
+            return self.clash_brush if clash else None
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.EditRole or not self.flags(index) & Qt.ItemIsEditable:
+            return False
+        day, is_classroom = self.get_column(index.column())
+        if index.row() == len(day.lessons):
+            day.add_empty()
+        if is_classroom:
+            day.set_classroom(index.row(), value)
+        else:
+            day.set_lesson(index.row(), value)
+        day.save()
+        return True
+
+    # Emits changes of the cells in the slots of the column pair of the day
+    def _update_cells(self, column, slots):
+        slots = [slot for slot in slots if slot < self.rows]
+        if slots:
+            self.dataChanged.emit(
+                self.index(min(slots), column), self.index(max(slots), column + 1)
+            )
+
+    def _update_rows(self):
+        rows = self.count_rows()
+        if rows > self.rows:
+            self.beginInsertRows(QModelIndex(), self.rows, rows - 1)
+            self.rows = rows
+            self.endInsertRows()
+        elif rows < self.rows:
+            self.beginRemoveRows(QModelIndex(), rows, self.rows - 1)
+            self.rows = rows
+            self.endRemoveRows()
+
+    def on_day_change(self, change):
+        for i, day in enumerate(self.days):
+            if day.day_order != change.day.day_order:
+                continue
+            slots = list(change.slots)
+            if day.id == change.day.id and change.kind in ("inserted", "removed"):
+                self._update_rows()
+                # The row after the last item of the day becomes (not) editable
+                slots.append(len(day.lessons))
+            self._update_cells(i * 2, slots)
+
+    def close(self):
+        Day.unsubscribe(self.on_day_change)
+
+
+class ModelSelectDelegate(QStyledItemDelegate):
+    """
+    Edits a cell of WeekTableModel with a combo box of lessons or classrooms
+    """
+
+    def createEditor(self, parent, option, index):
+        _, is_classroom = index.model().get_column(index.column())
+        cls = Classroom if is_classroom else Lesson
+        editor = QComboBox(parent)
+        editor.addItem(str(cls.null), cls.null)
+        for obj in sorted(
+            (i for i in cls.objects.values() if i.id > 0), key=lambda x: x.id
+        ):
+            editor.addItem(str(obj), obj)
+        return editor
+
+    def setEditorData(self, editor, index):
+        value = index.data(Qt.EditRole)
+        for i in range(editor.count()):
+            if editor.itemData(i).id == value:
+                editor.setCurrentIndex(i)
+                return
+        editor.setCurrentIndex(0)
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.currentData(), Qt.EditRole)
+
+
+class ScheduleTableDialog(ScheduleEditDialog):
+    """
+    Schedule editor that shows the week of the group in a table view
+    instead of a widget per day item
+    """
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        Day.unsubscribe(self.on_day_change)
+        self.table_model = WeekTableModel(parent=self)
+        self.table = QTableView(self)
+        self.table.setModel(self.table_model)
+        self.table.setItemDelegate(ModelSelectDelegate(self.table))
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.setEditTriggers(
+            QTableView.DoubleClicked | QTableView.SelectedClicked
+        )
+
+        buttons = QHBoxLayout()
+        uplift_btn = QPushButton("Выше")
+        downlift_btn = QPushButton("Ниже")
+        delete_btn = QPushButton("Удалить")
+        uplift_btn.clicked.connect(self.uplift)
+        downlift_btn.clicked.connect(self.downlift)
+        delete_btn.clicked.connect(self.delete_lesson)
+        buttons.addWidget(uplift_btn)
+        buttons.addWidget(downlift_btn)
+        buttons.addWidget(delete_btn)
+
+        self.scheduleSpace.setParent(None)
+        self.verticalLayout.addWidget(self.table)
+        self.verticalLayout.addLayout(buttons)
+
+    def update_content(self):
+        if self.selected_schedule and self.groupSelect.currentIndex() > -1:
+            with action("show week"):
+                week = Schedule.get_week(self.groupSelect.currentData())
+            self.table_model.set_week(week)
+
+    # Returns (day, slot) of the current cell if it has a day item
+    def get_current_item(self):
+        index = self.table.currentIndex()
+        if not index.isValid():
+            return None, None
+        day, _ = self.table_model.get_column(index.column())
+        if index.row() >= len(day.lessons):
+            return None, None
+        return day, index.row()
+
+    def _move(self, d):
+        day, slot = self.get_current_item()
+        if day is None:
+            return
+        if (day.downlift_at if d > 0 else day.uplift_at)(slot):
+            day.save()
+            current = self.table.currentIndex()
+            self.table.setCurrentIndex(
+                self.table_model.index(slot + d, current.column())
+            )
+        else:
+            ErrorDialog(self, "Операция невозможна").exec()
+
+    def uplift(self):
+        self._move(-1)
+
+    def downlift(self):
+        self._move(1)
+
+    def delete_lesson(self):
+        day, slot = self.get_current_item()
+        if day is None:
+            return
+        dialog = ConfirmDialog(self)
+        dialog.exec()
+        if dialog.confirmed:
+            day.remove_day_item_at(slot)
+            day.save()
+
+    def done(self, result):
+        self.table_model.close()
+        super().done(result)
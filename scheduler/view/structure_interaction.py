@@ -1,18 +1,21 @@
-from PyQt5.QtCore import Qt
+from bisect import bisect_left
+
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QSortFilterProxyModel
 from PyQt5.QtWidgets import (
-    QScrollArea,
     QHBoxLayout,
-    QWidget,
     QPushButton,
     QFormLayout,
-    QButtonGroup,
-    QRadioButton,
-    QCheckBox,
     QComboBox,
+    QListView,
+    QLineEdit,
+    QFileDialog,
+    QProgressDialog,
 )
 
 import scheduler.config as config
+from scheduler.data.importer import check_structure, create_models
 from .core import *
+from .field_widgets import get_widget_for_change, get_widget_for_info
 
 
 class EditModelDialog(QDialog):
@@ -32,7 +35,7 @@ class EditModelDialog(QDialog):
         for field in model.fields:
             name = field.name
             value = getattr(model, name)
-            widget, func = field.get_widget_for_change(self, value)
+            widget, func = get_widget_for_change(field, self, value)
             self.get_value_funcs[field.name] = func
             self.container.addRow(field.russian_name, widget)
         self.container.addWidget(self.buttonBox)
@@ -68,7 +71,7 @@ class CreateModelDialog(QDialog):
         for field in cls.fields:
             if field.name == "id":
                 continue
-            widget, func = field.get_widget_for_change(self, None)
+            widget, func = get_widget_for_change(field, self, None)
             self.get_value_funcs[field.name] = func
             self.container.addRow(field.russian_name + ":", widget)
 
@@ -106,7 +109,7 @@ class InfoModelDialog(QDialog):
         for field in model.fields:
             name = field.name
             value = getattr(model, name)
-            widget = field.get_widget_for_info(self, value)
+            widget = get_widget_for_info(field, self, value)
             self.container.addRow(field.russian_name, widget)
         self.container.addWidget(self.buttonBox)
         self.setLayout(self.container)
@@ -114,99 +117,151 @@ class InfoModelDialog(QDialog):
         self.setFixedSize(self.size())
 
 
-class ModelHolder(QWidget):
-    def __init__(self, parent, model):
-        super().__init__()
-        self.p = parent
-        self.model = model
-        self.setupUI()
-
-    def setupUI(self):
-        self.id_widget = QLabel(str(self.model.id))
-        self.id_widget.setFixedWidth(50)
-        self.name_widget = QLabel(str(self.model))
-        self.name_widget.setFixedWidth(120)
-        self.more_btn = QPushButton("Подробнее")
-        self.more_btn.clicked.connect(self.show_more)
-        self.container = QHBoxLayout()
-
-        self.container.addWidget(self.id_widget)
-        self.container.addWidget(self.name_widget)
-        self.container.addWidget(self.more_btn)
-
-        self.setLayout(self.container)
-
-    def show_more(self):
-        InfoModelDialog(self.p, self.model).exec()
+class ObjectListModel(QAbstractListModel):
+    """
+    List of objects for a QListView. Models are sorted by id and models
+    with id < 1 are skipped, other objects keep their order.
+    Rows may be checkable, only one row is checked if exclusive is set
+    """
 
+    def __init__(self, objects=(), checkable=False, exclusive=False, parent=None):
+        super().__init__(parent)
+        self.checkable = checkable
+        self.exclusive = exclusive
+        self.objects = []
+        self.keys = None
+        self.checked = set()
+        self.set_objects(objects)
+
+    def set_objects(self, objects):
+        self.beginResetModel()
+        if isinstance(objects, dict) and all(
+            hasattr(i, "id") for i in objects.values()
+        ):
+            self.objects = sorted(
+                filter(lambda x: x.id > 0, objects.values()), key=lambda x: x.id
+            )
+            # Ids of the objects, they are used to find rows by binary search
+            self.keys = [obj.id for obj in self.objects]
+        else:
+            self.objects = list(objects)
+            self.keys = None
+        self.checked = set()
+        self.endResetModel()
+
+    # Returns the row of the object or None
+    def find_row(self, obj):
+        if self.keys is None:
+            return self.objects.index(obj) if obj in self.objects else None
+        row = bisect_left(self.keys, obj.id)
+        if row < len(self.keys) and self.keys[row] == obj.id:
+            return row
+        return None
 
-class EditableModelHolder(ModelHolder):
-    def setupUI(self):
-        super().setupUI()
-        self.delete_btn = PicButton(self.p, config.DELETE_IMG)
-        self.delete_btn.clicked.connect(self.delete)
-        self.edit_btn = PicButton(self.p, config.EDIT_IMG)
-        self.edit_btn.clicked.connect(self.edit)
-
-        self.container.addWidget(self.delete_btn)
-        self.container.addWidget(self.edit_btn)
-
-    def edit(self):
-        EditModelDialog(self.p, self.model).exec()
-        self.update_text()
-
-    def delete(self):
-        d = ConfirmDialog(self.p)
-        d.exec()
-        if d.confirmed:
-            self.model.delete()
-            self.p.remove_holder(self)
-
-    def update_text(self):
-        self.name_widget.setText(str(self.model))
-
-
-class ChoosableModelHolder(ModelHolder):
-    choose_class = None
-
-    def __init__(self, parent, model, button_group):
-        self.button_group = button_group
-        super().__init__(parent, model)
-
-    def setupUI(self):
-        super().setupUI()
-        self.btn = self.__class__.choose_class(self.p)
-        self.button_group.addButton(self.btn)
-        self.container.addWidget(self.btn)
-
-    def is_checked(self):
-        return self.btn.isChecked()
-
-
-class RadioModelHolder(ChoosableModelHolder):
-    choose_class = QRadioButton
-
+    def get_object(self, row):
+        return self.objects[row]
+
+    def get_checked(self):
+        return [self.objects[row] for row in sorted(self.checked)]
+
+    def insert_object(self, obj):
+        if self.keys is None:
+            row = len(self.objects)
+        else:
+            row = bisect_left(self.keys, obj.id)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.objects.insert(row, obj)
+        if self.keys is not None:
+            self.keys.insert(row, obj.id)
+        self.checked = {i + 1 if i >= row else i for i in self.checked}
+        self.endInsertRows()
+
+    def remove_object(self, obj):
+        row = self.find_row(obj)
+        if row is None:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.objects[row]
+        if self.keys is not None:
+            del self.keys[row]
+        self.checked = {i - 1 if i > row else i for i in self.checked if i != row}
+        self.endRemoveRows()
+
+    # Replaces the object in its row or repaints the row if new_obj is None
+    def update_object(self, obj, new_obj=None):
+        row = self.find_row(obj)
+        if row is None:
+            return
+        if new_obj is not None:
+            self.objects[row] = new_obj
+        self.dataChanged.emit(self.index(row), self.index(row))
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.objects)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        obj = self.objects[index.row()]
+        if role == Qt.DisplayRole:
+            if self.keys is None:
+                return str(obj)
+            return f"{obj.id}. {obj}"
+        if role == Qt.CheckStateRole and self.checkable:
+            return Qt.Checked if index.row() in self.checked else Qt.Unchecked
+        return None
 
-class CheckboxModelHolder(ChoosableModelHolder):
-    choose_class = QCheckBox
+    def flags(self, index):
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        if self.checkable:
+            flags |= Qt.ItemIsUserCheckable
+        return flags
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.CheckStateRole or not self.checkable:
+            return False
+        row = index.row()
+        if value == Qt.Checked:
+            if self.exclusive:
+                for other in self.checked - {row}:
+                    self.checked.discard(other)
+                    self.dataChanged.emit(self.index(other), self.index(other))
+            self.checked.add(row)
+        else:
+            self.checked.discard(row)
+        self.dataChanged.emit(index, index)
+        return True
 
 
 class ItemListDialog(QDialog):
+    # None, "one" or "many" checked rows
+    check_mode = None
+
     def __init__(self, parent, objects, name):
         super().__init__(parent)
 
-        self.scroll = QScrollArea()
-        self.scroll_widget = QWidget()
-        self.objects_layout = QVBoxLayout()
-        self.objects_layout.setAlignment(Qt.AlignTop)
-        self.scroll_widget.setLayout(self.objects_layout)
-        self.scroll.setWidget(self.scroll_widget)
-        self.scroll.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOn)
-        self.scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.list_model = ObjectListModel(
+            objects,
+            checkable=self.check_mode is not None,
+            exclusive=self.check_mode == "one",
+            parent=self,
+        )
+        self.proxy_model = QSortFilterProxyModel(self)
+        self.proxy_model.setSourceModel(self.list_model)
+        self.proxy_model.setFilterCaseSensitivity(Qt.CaseInsensitive)
+
+        self.view = QListView()
+        self.view.setModel(self.proxy_model)
+        self.view.setUniformItemSizes(True)
+        self.view.doubleClicked.connect(
+            lambda index: self.on_double_click(self.get_object(index))
+        )
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("Поиск")
+        self.filter_edit.textChanged.connect(self.proxy_model.setFilterFixedString)
 
         self.objects = objects
         self.name = name
-        self.holders = dict()
 
     def exec(self):
         self.setupUI()
@@ -215,7 +270,6 @@ class ItemListDialog(QDialog):
     def setupUI(self):
         self.setWindowTitle(self.name)
         self.buttonBox = self.get_button_box()
-        self.update_objects()
         self.setFixedSize(410, 400)
 
         container = QVBoxLayout()
@@ -224,48 +278,49 @@ class ItemListDialog(QDialog):
             put_in_layout(item, container)
 
         container.setAlignment(Qt.AlignTop)
-        container.addWidget(self.scroll)
+        container.addWidget(self.filter_edit)
+        container.addWidget(self.view)
+
+        actions = self.get_action_widgets()
+        if actions:
+            layout = QHBoxLayout()
+            for item in actions:
+                put_in_layout(item, layout)
+            container.addItem(layout)
 
         if self.buttonBox:
             container.addWidget(self.buttonBox)
         self.setLayout(container)
 
+    # Shows self.objects again, single changes should use list_model methods
     def update_objects(self):
-        self.scroll.setParent(None)
-        if self.buttonBox:
-            self.buttonBox.setParent(None)
-        for i in reversed(range(self.objects_layout.count())):
-            self.objects_layout.itemAt(i).widget().setParent(None)
+        self.list_model.set_objects(self.objects)
 
-        objects = self.objects
-        if isinstance(objects, dict) and all(
-            hasattr(i, "id") for i in self.objects.values()
-        ):
-            objects = sorted(
-                filter(lambda x: x.id > 0, self.objects.values()), key=lambda x: x.id
-            )
+    # Returns object of the view index or None
+    def get_object(self, index):
+        if not index.isValid():
+            return None
+        return self.list_model.get_object(self.proxy_model.mapToSource(index).row())
 
-        for obj in objects:
-            put_in_layout(self.get_row(obj), self.objects_layout)
-
-        self.scroll_widget.adjustSize()
-        if self.layout():
-            self.layout().addWidget(self.scroll)
-            if self.buttonBox:
-                self.layout().addWidget(self.buttonBox)
+    def get_current(self):
+        return self.get_object(self.view.currentIndex())
 
     def get_header_widgets(self):
         return []
 
+    # Returns widgets under the list, they act on the current row
+    def get_action_widgets(self):
+        return []
+
+    def on_double_click(self, obj):
+        pass
+
     def get_button_box(self):
         QBtn = QDialogButtonBox.Ok
         buttonBox = QDialogButtonBox(QBtn)
         buttonBox.accepted.connect(self.accept)
         return buttonBox
 
-    def get_row(self, obj):
-        return QLabel(str(obj), self)
-
 
 class EditListDialog(ItemListDialog):
     def __init__(self, parent, classes):
@@ -276,10 +331,6 @@ class EditListDialog(ItemListDialog):
         self.classes = classes
         self.indexes = {cls.plural_class_name: i for i, cls in enumerate(classes)}
         self.current_cls = classes[0]
-        self.holders = dict()
-
-    def remove_holder(self, model_holder):
-        self.update_objects()
 
     def get_header_widgets(self):
         layout = QHBoxLayout()
@@ -288,31 +339,100 @@ class EditListDialog(ItemListDialog):
             self.select_class.addItem(cls.plural_class_name, cls)
         new_model_btn = QPushButton("Создать")
         new_model_btn.clicked.connect(self.create_model)
+        import_btn = QPushButton("Импорт")
+        import_btn.clicked.connect(self.import_models)
         layout.addWidget(self.select_class)
         layout.addWidget(new_model_btn)
+        layout.addWidget(import_btn)
 
         self.select_class.currentTextChanged.connect(self.change_objects)
 
         return [layout]
 
+    def get_action_widgets(self):
+        more_btn = QPushButton("Подробнее")
+        more_btn.clicked.connect(lambda: self.on_double_click(self.get_current()))
+        edit_btn = PicButton(self, config.EDIT_IMG)
+        edit_btn.clicked.connect(self.edit)
+        delete_btn = PicButton(self, config.DELETE_IMG)
+        delete_btn.clicked.connect(self.delete)
+        return [more_btn, edit_btn, delete_btn]
+
+    def on_double_click(self, obj):
+        if obj is not None:
+            InfoModelDialog(self, obj).exec()
+
     def change_objects(self, ev):
         self.current_cls = self.classes[self.indexes[ev]]
         self.objects = self.current_cls.objects
         self.update_objects()
 
     def create_model(self):
-        CreateModelDialog(self.parent(), self.current_cls).exec()
-        self.update_objects()
+        CreateModelDialog(self, self.current_cls).exec()
+
+    def edit(self):
+        model = self.get_current()
+        if model is not None:
+            EditModelDialog(self, model).exec()
+
+    def import_models(self):
+        filename = QFileDialog.getOpenFileName(
+            self, "Импорт", "", "Таблица (*.csv *.xlsx)"
+        )[0]
+        if not filename:
+            return
+        # The file is read and checked in a thread, the dialog blocks the list till then.
+        # Models are created here, so managers are changed only by the main thread
+        progress = QProgressDialog("Импорт...", None, 0, 0, self)
+        progress.setWindowTitle("Импорт")
+        progress.setWindowModality(Qt.WindowModal)
+        progress.show()
+
+        def show_result(result):
+            new, skipped, errors = result
+            if errors:
+                progress.close()
+                errors = "\n".join(errors[:10])
+                ErrorDialog(self, f"Ничего не импортировано:\n{errors}").exec()
+                return
+            try:
+                created = create_models(new)
+            except Exception as err:
+                show_error(str(err))
+                return
+            progress.close()
+            self.update_objects()
+            InfoDialog(
+                self,
+                f"Создано: {sum(created.values())}, "
+                f"пропущено: {sum(skipped.values())}",
+            ).exec()
+
+        def show_error(err):
+            progress.close()
+            ErrorDialog(self, f"Не удалось импортировать: {err}").exec()
+
+        worker = Worker(check_structure, filename)
+        worker.done.connect(show_result)
+        worker.failed.connect(show_error)
+        worker.start()
+
+    def delete(self):
+        model = self.get_current()
+        if model is None:
+            return
+        d = ConfirmDialog(self)
+        d.exec()
+        if d.confirmed:
+            model.delete()
+            self.list_model.remove_object(model)
 
     def update_model_info(self, model):
-        self.holders[model.id].update_text()
+        self.list_model.update_object(model)
 
     def add_model(self, model):
-        self.layout().addWidget(self.get_row(model))
-
-    def get_row(self, obj):
-        self.holders[obj.id] = EditableModelHolder(self, obj)
-        return self.holders[obj.id]
+        if isinstance(model, self.current_cls):
+            self.list_model.insert_object(model)
 
     def get_button_box(self):
         return None
@@ -322,21 +442,23 @@ class InfoItemListDialog(ItemListDialog):
     def __init__(self, parent, objects, name="Список объектов"):
         super().__init__(parent, objects, name)
 
-    def get_row(self, obj):
-        self.holders[obj.id] = ModelHolder(self, obj)
-        return self.holders[obj.id]
+    def get_action_widgets(self):
+        more_btn = QPushButton("Подробнее")
+        more_btn.clicked.connect(lambda: self.on_double_click(self.get_current()))
+        return [more_btn]
+
+    def on_double_click(self, obj):
+        if obj is not None:
+            InfoModelDialog(self, obj).exec()
 
 
 class SelectOneItemListDialog(InfoItemListDialog):
+    check_mode = "one"
+
     def __init__(self, parent, objects, name="Выбрать элемент"):
         super().__init__(parent, objects, name)
-        self.btn_group = QButtonGroup()
         self.selected = None
 
-    def get_row(self, obj):
-        self.holders[obj.id] = RadioModelHolder(self, obj, self.btn_group)
-        return self.holders[obj.id]
-
     def get_button_box(self):
         QBtn = QDialogButtonBox.Ok | QDialogButtonBox.Cancel
         buttonBox = QDialogButtonBox(QBtn)
@@ -345,28 +467,23 @@ class SelectOneItemListDialog(InfoItemListDialog):
         return buttonBox
 
     def accept(self):
-        for holder in self.holders.values():
-            if holder.is_checked():
-                self.selected = holder.model
-                break
+        self.selected = self.get_checked_result()
         super().accept()
 
+    def get_checked_result(self):
+        checked = self.list_model.get_checked()
+        return checked[0] if checked else None
+
     def get_selected(self):
         return self.selected
 
 
 class SelectManyItemListDialog(SelectOneItemListDialog):
+    check_mode = "many"
+
     def __init__(self, parent, objects, name="Выбрать элементы"):
         super().__init__(parent, objects, name)
         self.selected = []
 
-    def get_row(self, obj):
-        self.holders[obj.id] = CheckboxModelHolder(self, obj, self.btn_group)
-        return self.holders[obj.id]
-
-    def accept(self):
-        self.selected = []
-        for holder in self.holders.values():
-            if holder.is_checked():
-                self.selected.append(holder.model)
-        super().accept()
+    def get_checked_result(self):
+        return self.list_model.get_checked()
@@ -0,0 +1,61 @@
+import pytest
+
+import scheduler.data.database_interaction.db_utils as db_utils
+import scheduler.data.models.core as core
+from scheduler.config import MAIN_DB_NAME
+from scheduler.data.models.core import session
+from scheduler.data.models.structure import (
+    Group,
+    Teacher,
+    Lesson,
+    Classroom,
+    structure_load,
+)
+
+
+@pytest.fixture
+def group(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_utils, "STORE_DIR", str(tmp_path))
+    db_utils.create_db_with_models(MAIN_DB_NAME, Teacher, Group, Lesson, Classroom)
+    structure_load()
+    yield Group.new(name="Group 1")
+    db_utils.close_all_connections()
+
+
+def get_state():
+    return sorted(i for i in Group.objects if i > 0), Group.max_id.value
+
+
+def test_failure_in_block_restores_manager_and_max_id(group):
+    state = get_state()
+    with pytest.raises(RuntimeError):
+        with session():
+            Group.new_many(dict(name=f"Group {i}") for i in range(2, 5))
+            raise RuntimeError
+    assert get_state() == state
+    assert Group.new(name="Group 2").id == state[1] + 1
+
+
+def test_failure_in_flush_restores_manager_and_max_id(group, monkeypatch):
+    state = get_state()
+
+    def insert_many(*args):
+        raise RuntimeError
+
+    monkeypatch.setattr(core, "insert_many", insert_many)
+    with pytest.raises(RuntimeError):
+        with session():
+            Group.new_many(dict(name=f"Group {i}") for i in range(2, 5))
+    assert get_state() == state
+
+
+def test_failure_in_block_restores_stored_instances(group):
+    with pytest.raises(RuntimeError):
+        with session():
+            group.name = "Changed"
+            group.save()
+            group.delete()
+            raise RuntimeError
+    assert Group.objects[group.id] is group
+    assert group.name == "Group 1"
+    assert not group.is_dirty()